@@ -1,24 +1,48 @@
 import os
 import json
+import argparse
 import requests
 import shutil
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import sgo_cache
+import openrouter_client
+import alias_store
+from manifest import MANIFEST
+import rename_engine
+import rename_history
+from candidate_index import CandidateIndex
+from llm_cache import CACHE as LLM_CACHE, fingerprint, make_key
 
 # ==================================================================================
 # CONFIGURATION
 # ==================================================================================
-SPORTSGAMEODDS_API_KEY = os.environ.get("SPORTSGAMEODDS_API_KEY", "43f558d0dc54d4e2b06a7b3139dea679")
 OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY", "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")
 OPENROUTER_MODEL = "google/gemini-2.0-flash-001"
+# Bump whenever the get_ai_matches prompt changes so cached answers are not reused.
+PROMPT_VERSION = "normalize-v2"
 
 BASE_DIR = Path(__file__).parent
 LOGOS_DIR = BASE_DIR / "Logos"
-UNDO_LOG_FILE = BASE_DIR / "undo_log.json"
-UNDO_SCRIPT_FILE = BASE_DIR / "undo_rename.py"
 REPORT_FILE = BASE_DIR / "low_confidence_report.json"
 
 BATCH_SIZE = 20
+# Entities retrieved per filename; only the union of these goes into a batch prompt
+CANDIDATES_PER_FILE = int(os.environ.get("NORMALIZE_CANDIDATES_PER_FILE", "15"))
 CONFIDENCE_THRESHOLD = 0.90
+SPORT_WORKERS = int(os.environ.get("NORMALIZE_SPORT_WORKERS", "1"))
+
+# AI dispatch: batches in flight at once, request rate shared by all sports, per-batch deadline
+AI_CONCURRENCY = int(os.environ.get("NORMALIZE_AI_CONCURRENCY", "4"))
+AI_REQUESTS_PER_SECOND = float(os.environ.get("NORMALIZE_AI_RPS", "2"))
+AI_BATCH_TIMEOUT = float(os.environ.get("NORMALIZE_AI_TIMEOUT", "120"))
+AI_RATE_LIMITER = openrouter_client.TokenBucket(AI_REQUESTS_PER_SECOND, capacity=AI_CONCURRENCY)
+
+ALIASES = alias_store.STORE
+
+# Incremental mode: only files that are new/changed, undecided, or whose catalog changed are re-matched
+FULL_RESCAN = os.environ.get("NORMALIZE_FULL_RESCAN", "") == "1"
 
 # Map local directory names to API Sport IDs
 SPORT_DIR_MAP = {
@@ -37,93 +61,88 @@ SPORT_DIR_MAP = {
 # API HELPERS
 # ==================================================================================
 def fetch_all_teams(sport_id):
-    """Fetches all teams for a given sportID, handling pagination."""
-    url = "https://api.sportsgameodds.com/v2/teams"
-    headers = {"X-Api-Key": SPORTSGAMEODDS_API_KEY}
-    teams = []
-    cursor = None
-    
+    """Fetches all teams for a given sportID, served from the catalog cache when fresh."""
     print(f"Fetching teams for {sport_id}...")
-    
-    while True:
-        params = {"sportID": sport_id}
-        if cursor:
-            params["cursor"] = cursor
-            
-        try:
-            resp = requests.get(url, headers=headers, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            # Data structure handling
-            batch = data.get('data', []) if isinstance(data, dict) else data
-            teams.extend(batch)
-            
-            cursor = data.get('nextCursor') if isinstance(data, dict) else None
-            if not cursor:
-                break
-            print(f"    Fetched {len(batch)} teams. Next cursor: {str(cursor)[:10]}...")
-        except Exception as e:
-            print(f"Error fetching teams for {sport_id}: {e}")
-            break
-            
+    teams = sgo_cache.get_teams(sport_id)
     print(f"  -> Found {len(teams)} teams.")
     return teams
 
 def fetch_leagues(sport_id):
-    """Fetches leagues for a given sportID."""
-    url = "https://api.sportsgameodds.com/v2/leagues"
-    headers = {"X-Api-Key": SPORTSGAMEODDS_API_KEY}
-    params = {"sportID": sport_id}
-    
-    try:
-        resp = requests.get(url, headers=headers, params=params)
-        resp.raise_for_status()
-        data = resp.json()
-        leagues = data.get('data', [])
-        print(f"  -> Found {len(leagues)} leagues.")
-        return leagues
-    except Exception as e:
-        print(f"Error fetching leagues for {sport_id}: {e}")
-        return []
+    """Fetches leagues for a given sportID, served from the catalog cache when fresh."""
+    leagues = sgo_cache.get_leagues(sport_id)
+    print(f"  -> Found {len(leagues)} leagues.")
+    return leagues
+
+def simplify_entity(t):
+    """Reduces a team/league record to the fields the prompt needs."""
+    # Handle Team vs League differences
+    if 'teamID' in t:
+        # It's a Team
+        names = t.get('names', {})
+        return {
+            "type": "Team",
+            "name": names.get('medium'),
+            "full_name": names.get('long'),
+            "league": t.get('leagueID', 'Unknown')
+        }
+    # It's a League
+    return {
+        "type": "League",
+        "name": t.get('name'),
+        "short_name": t.get('shortName')
+    }
 
-def get_ai_matches(filenames, official_entities, sport_name):
-    """Asks AI to match filenames to official teams or leagues."""
-    url = "https://openrouter.ai/api/v1/chat/completions"
+def get_ai_matches(filenames, official_entities, sport_name, candidate_index=None):
+    """
+    Asks AI to match filenames to official teams or leagues (answers are cached per filename).
+    Instead of the whole catalog, each prompt carries the union of every file's top-k retrieved candidates.
+    """
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json"
     }
     
-    # Simplify official data for the prompt to save tokens
-    simplified_list = []
-    for t in official_entities:
-        # Handle Team vs League differences
-        if 'teamID' in t:
-            # It's a Team
-            names = t.get('names', {})
-            entry = {
-                "type": "Team",
-                "name": names.get('medium'),
-                "full_name": names.get('long'),
-                "league": t.get('leagueID', 'Unknown')
-            }
+    if candidate_index is None:
+        candidate_index = CandidateIndex(official_entities)
+    
+    # Retrieve candidates per file; the cache key covers that file's own candidates,
+    # so it does not change with whatever else happens to share the batch.
+    file_candidates = {
+        f: [simplify_entity(candidate_index.entities[i]) for i in candidate_index.top_k(f, CANDIDATES_PER_FILE)]
+        for f in filenames
+    }
+    keys = {f: make_key(OPENROUTER_MODEL, PROMPT_VERSION, f, fingerprint(file_candidates[f])) for f in filenames}
+    
+    # Serve files we already asked about with the same model/prompt/candidates from the cache
+    cached_matches = []
+    pending = []
+    for f in filenames:
+        hit = LLM_CACHE.get(keys[f])
+        if hit is not None:
+            cached_matches.append(hit)
         else:
-            # It's a League
-            entry = {
-                "type": "League",
-                "name": t.get('name'),
-                "short_name": t.get('shortName')
-            }
-        simplified_list.append(entry)
+            pending.append(f)
+    if cached_matches:
+        print(f"     {len(cached_matches)}/{len(filenames)} answered from LLM cache.")
+    if not pending:
+        return cached_matches
+        
+    simplified_list = []
+    seen = set()
+    for f in pending:
+        for entry in file_candidates[f]:
+            marker = json.dumps(entry, sort_keys=True)
+            if marker not in seen:
+                seen.add(marker)
+                simplified_list.append(entry)
     
     prompt = f"""
     You are a sports image expert. Match local filenames to official TEAMS or LEAGUES.
     
     SPORT: {sport_name}
-    OFFICIAL ENTITIES: {json.dumps(simplified_list[:600])}
+    OFFICIAL ENTITIES: {json.dumps(simplified_list)}
     
-    LOCAL FILES: {json.dumps(filenames)}
+    LOCAL FILES: {json.dumps(pending)}
 
     RULES:
     1. Match local filenames to one of the OFFICIAL ENTITIES.
@@ -155,14 +174,20 @@ def get_ai_matches(filenames, official_entities, sport_name):
     }
     
     try:
-        resp = requests.post(url, headers=headers, json=payload)
-        resp.raise_for_status()
-        result = resp.json()
+        result = openrouter_client.post_chat(payload, headers, limiter=AI_RATE_LIMITER, timeout=AI_BATCH_TIMEOUT)
         content = result['choices'][0]['message']['content']
-        return json.loads(content).get('matches', [])
+        matches = json.loads(content).get('matches', [])
     except Exception as e:
         print(f"  -> AI Request Failed: {e}")
-        return []
+        return cached_matches
+        
+    # Only answers the model actually gave are cached; omitted files are asked again next run
+    for res in matches:
+        fname = res.get('filename') if isinstance(res, dict) else None
+        if fname in keys:
+            LLM_CACHE.put(keys[fname], res, label=fname, source=f"normalize:{sport_name}")
+    LLM_CACHE.save()
+    return cached_matches + matches
 
 # ==================================================================================
 # CORE LOGIC
@@ -181,175 +206,283 @@ def sanitize_filename(name):
         name = name.replace(char, '')
     return name
 
-def main():
-    print("Starting Normalization Process...")
-    print(f"Model: {OPENROUTER_MODEL}")
-    print(f"Threshold: {CONFIDENCE_THRESHOLD}")
+def resolve_alias(sport_id, filename, name_map):
+    """Looks a filename up in the learned alias memory; returns the official name or None."""
+    entry = ALIASES.lookup(sport_id, filename)
+    if not entry:
+        return None
+    # Prefer the catalog's current spelling; trusted aliases may stand on their own
+    resolved = name_map.get(normalize_name(entry['official']))
+    if resolved:
+        return resolved
+    return entry['official'] if entry.get('trusted') else None
+
+def load_manual_overrides():
+    """Loads custom_mappings.json and ignore_list.json (written by ReviewLogos.py)."""
+    try:
+        with open("custom_mappings.json", 'r') as f:
+            custom_map = json.load(f)
+    except:
+        custom_map = {}
+        
+    try:
+        with open("ignore_list.json", 'r') as f:
+            ignore_list = set(json.load(f))
+    except:
+        ignore_list = set()
+    return custom_map, ignore_list
+
+def fetch_catalog(sport_id):
+    """(teams, leagues) for one sportID."""
+    return fetch_all_teams(sport_id), fetch_leagues(sport_id)
+
+def process_sport(local_dir_name, sport_id, custom_map, ignore_list, catalog=None):
+    """
+    Runs the fetch, walk and match stages for one sport.
+    `catalog` is a prefetched (teams, leagues); without it the sport fetches its own.
+    Returns (renames, low_confidence) without touching the disk, so sports can run concurrently.
+    """
+    renames = []        # List of {path, new_stem, reason}
+    low_confidence = [] # List of dicts for report
     
-    all_renames = []    # List of (old_path, new_name)
-    low_confidence_log = [] # List of dicts for report
+    local_sport_path = LOGOS_DIR / local_dir_name
+    if not local_sport_path.exists():
+        return renames, low_confidence
+        
+    print(f"\nProcessing {local_dir_name} ({sport_id})...")
     
-    # 1. Iterate Sports
-    for local_dir_name, sport_id in SPORT_DIR_MAP.items():
-        local_sport_path = LOGOS_DIR / local_dir_name
-        if not local_sport_path.exists():
-            continue
-            
-        print(f"\nProcessing {local_dir_name} ({sport_id})...")
+    # Fetch Official Data (Teams + Leagues)
+    official_teams, official_leagues = catalog if catalog is not None else fetch_catalog(sport_id)
+    
+    # Combine into one list for AI
+    official_entities = official_teams + official_leagues
+    
+    if not official_entities:
+        print("  -> No teams or leagues found, skipping.")
+        return renames, low_confidence
         
-        # Fetch Official Data (Teams + Leagues)
-        official_teams = fetch_all_teams(sport_id)
-        official_leagues = fetch_leagues(sport_id)
+    # Retrieval index for the AI tier (built once per sport, shared by all batches)
+    candidate_index = CandidateIndex(official_entities)
         
-        # Combine into one list for AI
-        official_entities = official_teams + official_leagues
+    # Build Lookup Map (Normalized Name -> Official Name)
+    # We index multiple variations (short, medium, long) pointing to the BEST official name (Long > Medium)
+    name_map = {}
+    
+    # 1. Add Teams
+    for t in official_teams:
+        names = t.get('names', {})
         
-        if not official_entities:
-            print("  -> No teams or leagues found, skipping.")
+        # Determine the Target Name (what we want to rename TO)
+        target_name = names.get('long') or names.get('medium') or names.get('short')
+        if not target_name:
             continue
             
-        # Build Lookup Map (Normalized Name -> Official Name)
-        # We index multiple variations (short, medium, long) pointing to the BEST official name (Long > Medium)
-        name_map = {}
+        # Map ALL variations to this target
+        if names.get('medium'):
+            name_map[normalize_name(names['medium'])] = target_name
         
-        # 1. Add Teams
-        for t in official_teams:
-            names = t.get('names', {})
+        if names.get('long'):
+            name_map[normalize_name(names['long'])] = target_name
             
-            # Determine the Target Name (what we want to rename TO)
-            target_name = names.get('long') or names.get('medium') or names.get('short')
-            if not target_name:
-                continue
-                
-            # Map ALL variations to this target
-            if names.get('medium'):
-                name_map[normalize_name(names['medium'])] = target_name
-            
-            if names.get('long'):
-                name_map[normalize_name(names['long'])] = target_name
-                
-            if names.get('short'):
-                 name_map[normalize_name(names['short'])] = target_name
-            # location can sometimes help too
-            if names.get('location') and names.get('medium'): # e.g. "Portland" + "Trail Blazers"
-                 combined = f"{names['location']} {names['medium']}"
-                 name_map[normalize_name(combined)] = target_name
+        if names.get('short'):
+             name_map[normalize_name(names['short'])] = target_name
+        # location can sometimes help too
+        if names.get('location') and names.get('medium'): # e.g. "Portland" + "Trail Blazers"
+             combined = f"{names['location']} {names['medium']}"
+             name_map[normalize_name(combined)] = target_name
 
-        # 2. Add Leagues
-        for l in official_leagues:
-            target_name = l.get('name') # e.g. "National Basketball Association"
-            if not target_name: 
-                continue
-                
-            name_map[normalize_name(target_name)] = target_name
+    # 2. Add Leagues
+    for l in official_leagues:
+        target_name = l.get('name') # e.g. "National Basketball Association"
+        if not target_name: 
+            continue
             
-            if l.get('shortName'):
-                name_map[normalize_name(l['shortName'])] = target_name
-            if l.get('leagueID'): # e.g. "NBA"
-                name_map[normalize_name(l['leagueID'])] = target_name
+        name_map[normalize_name(target_name)] = target_name
+        
+        if l.get('shortName'):
+            name_map[normalize_name(l['shortName'])] = target_name
+        if l.get('leagueID'): # e.g. "NBA"
+            name_map[normalize_name(l['leagueID'])] = target_name
+        
+    # Sorted so the order is stable for the manifest diff and catalog re-orderings
+    catalog_fp = fingerprint(sorted(json.dumps(e, sort_keys=True) for e in official_entities))
+    
+    # Walk Local Directory (manifest scan: re-hashes only files whose size/mtime changed)
+    local_files = []
+    carried_over = 0
+    for path_obj, changed in sorted(MANIFEST.scan(local_sport_path)):
+        file = path_obj.name
+        str_path = str(path_obj)
+        
+        # Check Manual Ignore
+        if str_path in ignore_list:
+            print(f"  [Ignored] {file}")
+            continue
             
-        # Load Manual Overrides
-        try:
-            with open("custom_mappings.json", 'r') as f:
-                custom_map = json.load(f)
-        except:
-            custom_map = {}
+        # Check Manual Rename
+        if str_path in custom_map:
+            new_name = custom_map[str_path]
+            # Add to renames immediately, skip further matching
+            renames.append({
+                "path": path_obj,
+                "new_stem": Path(new_name).stem,
+                "reason": "Manual Override",
+                "sport_id": sport_id,
+                "catalog": catalog_fp
+            })
+            continue
             
-        try:
-            with open("ignore_list.json", 'r') as f:
-                ignore_list = set(json.load(f))
-        except:
-            ignore_list = set()
-
-        # Walk Local Directory
-        local_files = []
-        for root, dirs, files in os.walk(local_sport_path):
-            for file in files:
-                if file.startswith('.') or file.lower().endswith('.ini'):
-                    continue
-                    
-                path_obj = Path(root) / file
-                str_path = str(path_obj)
-                
-                # Check Manual Ignore
-                if str_path in ignore_list:
-                    print(f"  [Ignored] {file}")
-                    continue
-                    
-                # Check Manual Rename
-                if str_path in custom_map:
-                    new_name = custom_map[str_path]
-                    # Add to renames immediately, skip further matching
-                    all_renames.append({
-                        "path": path_obj,
-                        "new_stem": Path(new_name).stem,
-                        "reason": "Manual Override"
-                    })
-                    continue
-                    
-                local_files.append(path_obj)
-                
-        if not local_files:
-            print("  -> No local files found (or all ignored/mapped).")
+        # Unchanged file, same catalog, decided last run: reuse that decision
+        if not FULL_RESCAN and not changed and not MANIFEST.needs_match(path_obj, catalog_fp):
+            decision = MANIFEST.decision(path_obj)
+            if decision.get('status') == "low_confidence":
+                low_confidence.append(decision['report'])
+            carried_over += 1
             continue
             
-        unmatched_files = []
+        local_files.append(path_obj)
+        
+    if carried_over:
+        print(f"  -> {carried_over} unchanged files skipped (decided on a previous run).")
+    if not local_files:
+        print("  -> No local files found (or all ignored/mapped/unchanged).")
+        return renames, low_confidence
+        
+    unmatched_files = []
+    alias_hits = 0
+    
+    # 2. Simple String Matching, then Learned Aliases from past confirmed decisions
+    for file_path in local_files:
+        norm_file = normalize_name(file_path.name)
         
-        # 2. Simple String Matching
-        for file_path in local_files:
-            norm_file = normalize_name(file_path.name)
+        if norm_file in name_map:
+            official = name_map[norm_file]
+            reason = "Exact Text Match"
+        else:
+            official = resolve_alias(sport_id, file_path.name, name_map)
+            reason = "Learned Alias"
             
-            if norm_file in name_map:
-                official = name_map[norm_file]
-                if official != Path(file_path).stem: # Only rename if different
-                    all_renames.append({
-                        "path": file_path, 
-                        "new_stem": official,
-                        "reason": "Exact Text Match"
-                    })
+        if official:
+            if reason == "Learned Alias":
+                alias_hits += 1
+            if official != Path(file_path).stem: # Only rename if different
+                renames.append({
+                    "path": file_path, 
+                    "new_stem": official,
+                    "reason": reason,
+                    "sport_id": sport_id,
+                    "catalog": catalog_fp
+                })
             else:
-                unmatched_files.append(file_path)
-                
-        print(f"  -> {len(all_renames)} exact matches found so far.")
-        print(f"  -> {len(unmatched_files)} files require AI matching.")
+                MANIFEST.record_decision(file_path, catalog_fp, {"status": "matched", "official": official})
+        else:
+            unmatched_files.append(file_path)
+            
+    print(f"  -> {len(renames)} exact matches found so far ({alias_hits} from learned aliases).")
+    print(f"  -> {len(unmatched_files)} files require AI matching.")
+    
+    # 3. AI Matching (Batched, up to AI_CONCURRENCY batches in flight)
+    batches = [unmatched_files[i:i+BATCH_SIZE] for i in range(0, len(unmatched_files), BATCH_SIZE)]
+    
+    def run_batch(numbered_batch):
+        number, batch = numbered_batch
+        print(f"  -> AI Batch {number}/{len(batches)} ({local_dir_name})...")
+        return get_ai_matches([p.name for p in batch], official_entities, local_dir_name, candidate_index)
         
-        # 3. AI Matching (Batched)
-        for i in range(0, len(unmatched_files), BATCH_SIZE):
-            batch = unmatched_files[i:i+BATCH_SIZE]
-            batch_names = [p.name for p in batch]
+    # dispatch() returns results in batch order, so each result list is joined to its own paths
+    batch_results = openrouter_client.dispatch(enumerate(batches, 1), run_batch, AI_CONCURRENCY)
+    
+    for batch, ai_results in zip(batches, batch_results):
+        # Process AI Results
+        for res in ai_results:
+            fname = res.get('filename')
+            official = res.get('official_name')
+            conf = res.get('confidence') or 0.0
+            reason = res.get('reasoning', '')
             
-            print(f"  -> AI Batch {i//BATCH_SIZE + 1}...")
-            ai_results = get_ai_matches(batch_names, official_entities, local_dir_name)
+            # Find the full path object for this filename
+            # (Simple lookup, assuming unique filenames in batch or relying on order if names duplicated)
+            # To be safe, let's look it up in the batch list
+            original_path = next((p for p in batch if p.name == fname), None)
             
-            # Process AI Results
-            for res in ai_results:
-                fname = res.get('filename')
-                official = res.get('official_name')
-                conf = res.get('confidence') or 0.0
-                reason = res.get('reasoning', '')
-                
-                # Find the full path object for this filename
-                # (Simple lookup, assuming unique filenames in batch or relying on order if names duplicated)
-                # To be safe, let's look it up in the batch list
-                original_path = next((p for p in batch if p.name == fname), None)
+            if not original_path:
+                continue
                 
-                if not original_path:
-                    continue
-                    
-                if conf >= CONFIDENCE_THRESHOLD and official:
-                    all_renames.append({
-                        "path": original_path,
-                        "new_stem": official,
-                        "reason": f"AI Match ({conf}): {reason}"
-                    })
-                else:
-                    low_confidence_log.append({
-                        "sport": local_dir_name,
-                        "file": str(original_path),
-                        "suggested": official,
-                        "confidence": conf,
-                        "reason": reason
-                    })
+            if conf >= CONFIDENCE_THRESHOLD and official:
+                renames.append({
+                    "path": original_path,
+                    "new_stem": official,
+                    "reason": f"AI Match ({conf}): {reason}",
+                    "sport_id": sport_id,
+                    "catalog": catalog_fp
+                })
+            else:
+                report = {
+                    "sport": local_dir_name,
+                    "sport_id": sport_id,
+                    "file": str(original_path),
+                    "suggested": official,
+                    "confidence": conf,
+                    "reason": reason
+                }
+                low_confidence.append(report)
+                MANIFEST.record_decision(original_path, catalog_fp, {"status": "low_confidence", "report": report})
+
+    return renames, low_confidence
+
+def main(workers=1):
+    print("Starting Normalization Process...")
+    
+    # A half-applied batch must be finished or undone before the tree is matched again
+    if rename_engine.read_journal() is not None:
+        print(f"Found an interrupted rename batch ({rename_engine.JOURNAL_FILE.name}).")
+        print("Run 'python rename_engine.py resume' or 'python rename_engine.py rollback' first.")
+        return
+        
+    print(f"Model: {OPENROUTER_MODEL}")
+    print(f"Threshold: {CONFIDENCE_THRESHOLD}")
+    
+    all_renames = []    # List of (old_path, new_name)
+    low_confidence_log = [] # List of dicts for report
+    
+    custom_map, ignore_list = load_manual_overrides()
+    
+    # Learned aliases are seeded once from the existing undo log, manual mappings and logo.csv
+    if not ALIASES.path.exists():
+        ALIASES.load()
+        print(f"Seeded {alias_store.seed(ALIASES, SPORT_DIR_MAP)} learned aliases.")
+        ALIASES.save()
+    
+    # 1. Iterate Sports
+    # Sports are independent until the rename phase, so they can run side by side.
+    # Results are merged in SPORT_DIR_MAP order so the output does not depend on scheduling.
+    sports = list(SPORT_DIR_MAP.items())
+    if workers > 1:
+        print(f"Running {len(sports)} sports with {workers} workers...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Several folders share a sportID (Football and College are both FOOTBALL): fetch each once
+            sport_ids = sorted({sport_id for local_dir_name, sport_id in sports if (LOGOS_DIR / local_dir_name).exists()})
+            catalogs = dict(zip(sport_ids, executor.map(fetch_catalog, sport_ids)))
+            futures = [
+                executor.submit(process_sport, local_dir_name, sport_id, custom_map, ignore_list, catalogs.get(sport_id))
+                for local_dir_name, sport_id in sports
+            ]
+            results = []
+            for (local_dir_name, _), future in zip(sports, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"  [ERR] {local_dir_name} failed: {e}")
+                    results.append(([], []))
+    else:
+        results = [
+            process_sport(local_dir_name, sport_id, custom_map, ignore_list)
+            for local_dir_name, sport_id in sports
+        ]
+        
+    for renames, low_confidence in results:
+        all_renames.extend(renames)
+        low_confidence_log.extend(low_confidence)
 
     # ==============================================================================
     # EXECUTION PHASE
@@ -360,85 +493,59 @@ def main():
         json.dump(low_confidence_log, f, indent=2)
     print(f"\nReport generated: {REPORT_FILE} ({len(low_confidence_log)} items)")
         
-    # 2. Generate Undo Logic & Execute Renames
+    # 2. Execute Renames & Record History
     if not all_renames:
+        MANIFEST.save()
         print("No renames to perform.")
         return
 
     print(f"\nExecuting {len(all_renames)} renames...")
-    undo_map = {}
+    applied = [] # (src, dst) of every step that ran, in order, for the rename history
     
-    for item in all_renames:
-        old_path = item['path']
-        new_stem = sanitize_filename(item['new_stem'])
-        new_name = f"{new_stem}{old_path.suffix}"
-        new_path = old_path.parent / new_name
-        
-        # Skip if identical
-        if old_path == new_path:
+    # Plan the whole batch against one listing per folder (collisions, chains and cycles
+    # resolved in memory), then apply it behind a write-ahead journal.
+    moves, steps = rename_engine.plan_renames(
+        [(item['path'], sanitize_filename(item['new_stem'])) for item in all_renames]
+    )
+    errors = rename_engine.execute(moves, steps, meta={"tool": "Normalize.py"}, applied=applied)
+    
+    for move in moves:
+        item = all_renames[move['index']]
+        old_path = Path(move['src'])
+        new_path = Path(move['dst'])
+        error = errors.get(move['index'])
+        if error:
+            print(f"  [ERR] Failed to rename {old_path.name}: {error}")
             continue
             
-        # Handle Collisions
-        if new_path.exists():
-            counter = 1
-            while new_path.exists():
-                new_name = f"{new_stem}_{counter}{old_path.suffix}"
-                new_path = old_path.parent / new_name
-                counter += 1
+        print(f"  [OK] {old_path.name} -> {new_path.name}")
         
-        try:
-            # Record for Undo
-            undo_map[str(new_path)] = str(old_path)
-            
-            # Rename
-            old_path.rename(new_path)
-            print(f"  [OK] {old_path.name} -> {new_path.name}")
-        except Exception as e:
-            print(f"  [ERR] Failed to rename {old_path.name}: {e}")
-            
-    # Save Undo Log
-    with open(UNDO_LOG_FILE, 'w') as f:
-        json.dump(undo_map, f, indent=2)
+        MANIFEST.record_rename(old_path, new_path, item.get('catalog'), {"status": "renamed", "from": old_path.name})
         
-    # Write Undo Script
-    undo_script_content = """
-import json
-import os
-import shutil
-from pathlib import Path
-
-LOG_FILE = Path("undo_log.json")
-
-def main():
-    if not LOG_FILE.exists():
-        print("No undo log found.")
-        return
-        
-    with open(LOG_FILE, 'r') as f:
-        data = json.load(f)
-        
-    print(f"Reverting {len(data)} files...")
-    
-    for new_path_str, old_path_str in data.items():
-        new_path = Path(new_path_str)
-        old_path = Path(old_path_str)
-        
-        if new_path.exists():
-            try:
-                new_path.rename(old_path)
-                print(f" reverted: {new_path.name} -> {old_path.name}")
-            except Exception as e:
-                print(f" failed: {new_path.name} -> {e}")
-        else:
-            print(f" missing: {new_path.name}")
+        # Remember confirmed AI / manual decisions so the next run resolves them locally
+        if item.get('sport_id') and not item['reason'].startswith(("Exact", "Learned")):
+            ALIASES.record(item['sport_id'], old_path.name, item['new_stem'], "normalize")
             
-if __name__ == "__main__":
-    main()
-"""
-    with open(UNDO_SCRIPT_FILE, 'w') as f:
-        f.write(undo_script_content)
-        
-    print(f"\nDone! Undo script saved to {UNDO_SCRIPT_FILE}")
+    ALIASES.save()
+    MANIFEST.save()
+    
+    # Append this run to the rename history (older runs stay undoable)
+    run_id = rename_history.append_run("Normalize.py", applied)
+    
+    print(f"\nDone! Run {run_id} recorded in {rename_history.HISTORY_FILE.name}; undo with 'python undo_rename.py'.")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Normalize logo filenames against the SportsGameOdds catalog.")
+    parser.add_argument("--workers", type=int, default=SPORT_WORKERS,
+                        help="Number of sports to fetch/walk/match concurrently (1 = sequential).")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-match every file instead of only new/changed ones (see manifest.py).")
+    sgo_cache.add_cache_arguments(parser)
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    sgo_cache.configure_from_args(args)
+    if args.full:
+        FULL_RESCAN = True
+    main(workers=args.workers)
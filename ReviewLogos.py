@@ -2,6 +2,9 @@ import json
 import os
 from pathlib import Path
 
+import alias_store
+from logo_index import INDEX
+
 BASE_DIR = Path(__file__).parent
 REPORT_FILE = BASE_DIR / "low_confidence_report.json"
 CUSTOM_MAP_FILE = BASE_DIR / "custom_mappings.json"
@@ -20,6 +23,11 @@ def save_json(path, data):
     with open(path, 'w') as f:
         json.dump(data, f, indent=2)
 
+def remember_alias(item, new_name):
+    """Feeds a reviewer decision into the learned alias memory (reports from older runs lack sport_id)."""
+    if item.get('sport_id'):
+        alias_store.STORE.record(item['sport_id'], Path(item['file']).name, Path(new_name).stem, "review")
+
 def main():
     print("=== Low Confidence Logo Review Tool ===")
     
@@ -31,14 +39,20 @@ def main():
     custom_map = load_json(CUSTOM_MAP_FILE, {})
     ignore_list = set(load_json(IGNORE_LIST_FILE, []))
     
-    # Filter out items already handled
+    # Filter out items already handled, and files renamed or removed since the report was written
     items_to_review = []
+    gone = 0
     for item in report:
         fpath = item['file']
         if fpath in custom_map or fpath in ignore_list:
             continue
+        if Path(fpath).is_absolute() and INDEX.rel(fpath) is not None and not INDEX.exists(fpath):
+            gone += 1
+            continue
         items_to_review.append(item)
         
+    if gone:
+        print(f"Skipping {gone} items whose file no longer exists.")
     print(f"Found {len(items_to_review)} items pending review.\n")
     
     try:
@@ -76,9 +90,11 @@ def main():
                     # Strip quotes if user added them
                     new_name = new_name.replace('"', '').replace("'", "")
                     custom_map[fpath] = new_name
+                    remember_alias(item, new_name)
                     print(f"    -> Mapped to '{new_name}'")
             elif choice == '3' and suggested:
                 custom_map[fpath] = f"{suggested}{Path(fpath).suffix}"
+                remember_alias(item, suggested)
                 print(f"    -> Mapped to '{custom_map[fpath]}'")
             else:
                 print("    Invalid choice, skipping.")
@@ -91,6 +107,7 @@ def main():
     # Save results
     save_json(CUSTOM_MAP_FILE, custom_map)
     save_json(IGNORE_LIST_FILE, list(ignore_list))
+    alias_store.STORE.save()
     
     print("\nReview session saved.")
     print(f"Total Custom Mappings: {len(custom_map)}")
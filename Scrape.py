@@ -1,41 +1,230 @@
 
 import os
 import re
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import threading
 import requests
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from bs4 import BeautifulSoup
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import urllib3
 
+from logo_index import INDEX
+from download_manifest import DOWNLOADS
+from phash_index import PHASHES
+from openrouter_client import TokenBucket
+
 # Suppress SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-def download_logos():
-    url = "https://www.sportslogos.net/teams/list_by_league/8/Canadian-Football-League-Logos/CFL-Logos/"
-    
-    # Headers to mimic a browser request to avoid being blocked
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
-        "Referer": "https://www.sportslogos.net/"
-    }
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGOS_DIR = os.path.join(SCRIPT_DIR, "Logos")
+DEFAULT_LEAGUE_URL = "https://www.sportslogos.net/teams/list_by_league/8/Canadian-Football-League-Logos/CFL-Logos/"
 
-    # Create a session with retry logic to handle SSL/Connection errors
+# Headers to mimic a browser request to avoid being blocked
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
+    "Referer": "https://www.sportslogos.net/"
+}
+
+# Image downloads in flight at once, and at most this many against any one host
+DOWNLOAD_WORKERS = int(os.environ.get("SCRAPE_WORKERS", "8"))
+PER_HOST_LIMIT = int(os.environ.get("SCRAPE_PER_HOST", "4"))
+PER_HOST_RPS = float(os.environ.get("SCRAPE_PER_HOST_RPS", "4"))
+
+# Crawl mode: league pages -> Logos/SPORT/LEAGUE folders, with per-league progress kept across runs
+LEAGUES_FILE = os.path.join(SCRIPT_DIR, "scrape_leagues.json")
+CRAWL_STATE_FILE = os.path.join(SCRIPT_DIR, "scrape_state.json")
+LEAGUE_WORKERS = int(os.environ.get("SCRAPE_LEAGUE_WORKERS", "2"))
+CRAWL_RETRIES = int(os.environ.get("SCRAPE_RETRIES", "3"))
+
+# Image validation: anything else is treated as a failed download and never lands in Logos/
+MAX_IMAGE_BYTES = int(os.environ.get("SCRAPE_MAX_IMAGE_BYTES", str(20 * 1024 * 1024)))
+ALLOWED_CONTENT_TYPES = ("image/", "application/octet-stream")
+CHUNK_SIZE = 64 * 1024
+
+# New images that look like a logo we already hold (perceptual hash within this many bits) are not
+# stored. 0 only catches the same picture re-encoded or resized; negative turns the check off.
+NEAR_DUPLICATE_RADIUS = int(os.environ.get("SCRAPE_NEAR_DUP_RADIUS", "0"))
+
+
+class InvalidImage(Exception):
+    """Raised when a response is not an image, is too large, or arrived truncated."""
+
+
+class HostLimiter:
+    """
+    Caps concurrent requests and the request rate per host, so a big pool (or several
+    leagues crawling at once) stays polite to any single server.
+    """
+
+    def __init__(self, limit, rate=None):
+        self.limit = max(1, limit)
+        self.rate = rate
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            if host not in self.hosts:
+                bucket = TokenBucket(self.rate, capacity=self.limit) if self.rate else None
+                self.hosts[host] = (threading.BoundedSemaphore(self.limit), bucket)
+            semaphore, bucket = self.hosts[host]
+        with semaphore:
+            if bucket:
+                bucket.acquire()
+            yield
+
+
+def make_session(pool_size):
+    """Session with retries and a connection pool big enough that no worker waits for a socket."""
     session = requests.Session()
     retry_strategy = Retry(total=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-    adapter = HTTPAdapter(max_retries=retry_strategy)
+    adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=pool_size, pool_maxsize=pool_size)
     session.mount("https://", adapter)
     session.mount("http://", adapter)
+    return session
 
-    print(f"Fetching {url}...")
+
+def stream_to_temp(response, file_path):
+    """
+    Streams a response body into a hidden temp file next to file_path, hashing as it goes.
+    Validates the content type and size (declared and actual). Returns (temp path, sha256, size);
+    the temp file is removed if anything goes wrong. Content-Length counts the bytes on the wire,
+    so for gzip/deflate responses it is checked against what was read off the socket, not the
+    decoded size.
+    """
+    content_type = (response.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+    if content_type and not content_type.startswith(ALLOWED_CONTENT_TYPES):
+        raise InvalidImage(f"unexpected content type {content_type}")
+    declared = response.headers.get("Content-Length")
+    declared = int(declared) if declared and declared.isdigit() else None
+    if declared is not None and declared > MAX_IMAGE_BYTES:
+        raise InvalidImage(f"{declared} bytes exceeds the {MAX_IMAGE_BYTES} byte limit")
+
+    # Dot-prefixed, so no tool treats it as a logo while it is being written
+    directory, name = os.path.split(file_path)
+    tmp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.part")
+    digest = hashlib.sha256()
+    size = 0
     try:
-        response = session.get(url, headers=headers, verify=False)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        print(f"Error fetching the page: {e}")
-        return
+        with open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > MAX_IMAGE_BYTES:
+                    raise InvalidImage(f"more than {MAX_IMAGE_BYTES} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        if size == 0:
+            raise InvalidImage("empty response")
+        encoded = (response.headers.get("Content-Encoding") or "identity").strip().lower() != "identity"
+        received = response.raw.tell() if encoded else size
+        if declared is not None and received != declared:
+            raise InvalidImage(f"truncated: got {received} of {declared} bytes")
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
 
-    soup = BeautifulSoup(response.content, "html.parser")
 
+def download_one(session, limiter, headers, job):
+    """
+    Fetches one image with a conditional GET and writes it only if its bytes are new.
+    The body is streamed to a temp file and renamed into place once complete and valid,
+    so a failed transfer never leaves a truncated logo behind.
+    Returns (job, bytes transferred, status, detail) where status is one of
+    downloaded / unchanged (304) / identical (same bytes already in place) / duplicate / failed.
+    """
+    team_name, src, file_path = job
+    try:
+        request_headers = dict(headers, **DOWNLOADS.conditional_headers(src, file_path))
+        with limiter.slot(src):
+            with session.get(src, headers=request_headers, verify=False, timeout=30, stream=True) as img_response:
+                if img_response.status_code == 304:
+                    DOWNLOADS.touch(src)
+                    return job, 0, "unchanged", None
+                img_response.raise_for_status()
+                tmp_path, digest, size = stream_to_temp(img_response, file_path)
+                response_headers = img_response.headers
+
+        existing = DOWNLOADS.existing_copy(src, digest, file_path)
+        if existing:
+            os.remove(tmp_path)
+            if existing == "same":
+                DOWNLOADS.record(src, file_path, response_headers, digest, size)
+                return job, size, "identical", None
+            # Another team's file already has these exact bytes; don't write a second copy
+            DOWNLOADS.record(src, file_path, response_headers, digest, size, duplicate_of=existing)
+            return job, size, "duplicate", existing
+
+        if NEAR_DUPLICATE_RADIUS >= 0:
+            target = INDEX.rel(file_path)
+            similar = [p for _, p in PHASHES.check(tmp_path, NEAR_DUPLICATE_RADIUS) if p != target]
+            if similar:
+                os.remove(tmp_path)
+                DOWNLOADS.record(src, file_path, response_headers, digest, size, duplicate_of=similar[0])
+                return job, size, "duplicate", similar[0]
+
+        os.replace(tmp_path, file_path)
+        INDEX.add(file_path)
+        if NEAR_DUPLICATE_RADIUS >= 0:
+            PHASHES.add(file_path, digest)
+        DOWNLOADS.record(src, file_path, response_headers, digest, size)
+        return job, size, "downloaded", None
+    except Exception as e:
+        return job, 0, "failed", e
+
+
+def download_all(session, headers, jobs, workers=DOWNLOAD_WORKERS, limiter=None):
+    """
+    Downloads every (team_name, src, file_path) job on a bounded pool and prints a throughput summary.
+    Pass a shared `limiter` when several calls run at once so the per-host caps hold across all of them.
+    """
+    limiter = limiter or HostLimiter(PER_HOST_LIMIT, PER_HOST_RPS)
+    started = time.monotonic()
+    total_bytes = 0
+    counts = {"downloaded": 0, "unchanged": 0, "identical": 0, "duplicate": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(download_one, session, limiter, headers, job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            (team_name, _, file_path), size, status, detail = future.result()
+            counts[status] += 1
+            total_bytes += size
+            if status == "failed":
+                print(f"[{done}/{len(jobs)}] Failed to download {team_name}: {detail}")
+            elif status == "downloaded":
+                print(f"[{done}/{len(jobs)}] Downloaded: {os.path.basename(file_path)}")
+            elif status == "duplicate":
+                print(f"[{done}/{len(jobs)}] Same image as {detail}, not written: {os.path.basename(file_path)}")
+            else:
+                print(f"[{done}/{len(jobs)}] Up to date: {os.path.basename(file_path)}")
+    DOWNLOADS.save()
+    PHASHES.save()
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    print(f"{counts['downloaded']} downloaded, {counts['unchanged']} not modified, {counts['identical']} identical, "
+          f"{counts['duplicate']} duplicates, {counts['failed']} failed.")
+    print(f"{total_bytes / 1024:.1f} KiB transferred in {elapsed:.2f}s "
+          f"({len(jobs) / elapsed:.1f} files/s, {total_bytes / 1024 / elapsed:.1f} KiB/s).")
+    return counts
+
+
+def find_logo_images(soup):
+    """The <img> tags of a league's logo wall."""
     # Find the container for the logos. On sportslogos.net, this is typically <ul class="logoWall">
     logo_wall = soup.find(class_="logoWall")
     images = []
@@ -48,21 +237,12 @@ def download_logos():
         for img in soup.find_all("img"):
             if "/logos/" in img.get("src", ""):
                 images.append(img)
+    return images
 
-    if not images:
-        print("No images found.")
-        if soup.title:
-            print(f"Page title: {soup.title.text.strip()}")
-        return
-
-    # Create a directory for the logos
-    # Use absolute path based on script location
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    save_dir = os.path.join(script_dir, "Logos")
-    os.makedirs(save_dir, exist_ok=True)
-    
-    print(f"Found {len(images)} logos. Downloading to '{save_dir}'...")
 
+def build_jobs(images, save_dir):
+    """(team_name, src, file_path) for every usable logo image."""
+    jobs = []
     for img in images:
         src = img.get("src")
         # Use title or alt for the team name
@@ -92,18 +272,146 @@ def download_logos():
             ext = src.split(".")[-1].split("?")[0]
 
         file_path = os.path.join(save_dir, f"{safe_filename}.{ext}")
+        jobs.append((team_name, src, file_path))
+    return jobs
+
+
+def scrape_league(session, limiter, url, save_dir):
+    """Fetches one league page and downloads its logo wall into save_dir. Raises if the page yields nothing."""
+    print(f"Fetching {url}...")
+    with limiter.slot(url):
+        response = session.get(url, headers=HEADERS, verify=False, timeout=30)
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.content, "html.parser")
+    images = find_logo_images(soup)
+    if not images:
+        title = soup.title.text.strip() if soup.title else "no title"
+        raise ValueError(f"No images found (page title: {title})")
 
-        try:
-            img_response = session.get(src, headers=headers, verify=False)
-            img_response.raise_for_status()
-            img_data = img_response.content
-            with open(file_path, "wb") as f:
-                f.write(img_data)
-            print(f"Downloaded: {safe_filename}")
-        except Exception as e:
-            print(f"Failed to download {team_name}: {e}")
+    os.makedirs(save_dir, exist_ok=True)
+    print(f"Found {len(images)} logos. Downloading to '{save_dir}'...")
+    return download_all(session, HEADERS, build_jobs(images, save_dir), limiter=limiter)
+
+
+def prepare_near_duplicate_check():
+    """Hashes whatever the collection gained since the last run, before any download compares against it."""
+    if NEAR_DUPLICATE_RADIUS >= 0:
+        PHASHES.update()
+        PHASHES.save()
 
+
+def download_logos(url=DEFAULT_LEAGUE_URL, save_dir=LOGOS_DIR):
+    """Scrapes a single league page (by default the CFL, into the Logos/ root)."""
+    prepare_near_duplicate_check()
+    # Create a session with retry logic to handle SSL/Connection errors
+    session = make_session(DOWNLOAD_WORKERS)
+    try:
+        scrape_league(session, HostLimiter(PER_HOST_LIMIT, PER_HOST_RPS), url, save_dir)
+    except (requests.RequestException, ValueError) as e:
+        print(f"Error fetching the page: {e}")
+        return
     print("Done.")
 
+# ==================================================================================
+# CRAWL MODE
+# ==================================================================================
+def load_json_file(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Could not read {os.path.basename(path)} ({e}).")
+        return default
+
+
+def save_crawl_state(state):
+    tmp_path = CRAWL_STATE_FILE + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, CRAWL_STATE_FILE)
+
+
+def crawl(leagues, workers=LEAGUE_WORKERS, retries=CRAWL_RETRIES, restart=False):
+    """
+    Scrapes every {"url", "folder"} league into Logos/<folder>.
+
+    Leagues run `workers` at a time on one session, sharing a HostLimiter so the
+    per-host caps hold across the whole job. A failing league is retried with
+    backoff. Progress is saved to scrape_state.json after each league, so a rerun
+    skips leagues already done (unless `restart`). A league whose page loaded but some
+    images failed is recorded as "partial" and queued again on the next run; images that
+    did arrive are skipped then by their conditional GET.
+    """
+    state = {} if restart else load_json_file(CRAWL_STATE_FILE, {})
+    queue = [league for league in leagues if state.get(league['url'], {}).get('status') != "done"]
+    skipped = len(leagues) - len(queue)
+    print(f"Crawling {len(queue)} leagues ({skipped} already done), {workers} at a time...")
+
+    prepare_near_duplicate_check()
+    session = make_session(DOWNLOAD_WORKERS * max(1, workers))
+    limiter = HostLimiter(PER_HOST_LIMIT, PER_HOST_RPS)
+    state_lock = threading.Lock()
+
+    def run(league):
+        url, folder = league['url'], league['folder']
+        save_dir = os.path.join(LOGOS_DIR, *folder.strip("/").split("/"))
+        error = None
+        for attempt in range(retries + 1):
+            try:
+                counts = scrape_league(session, limiter, url, save_dir)
+                status = "partial" if counts["failed"] else "done"
+                record = {"folder": folder, "status": status, "attempts": attempt + 1, "counts": counts}
+                error = None
+                break
+            except Exception as e:
+                error = e
+                print(f"[{folder}] attempt {attempt + 1} failed: {e}")
+                if attempt < retries:
+                    time.sleep(2 ** attempt)
+        if error:
+            record = {"folder": folder, "status": "failed", "attempts": retries + 1, "error": str(error)}
+        record["updated"] = time.time()
+        with state_lock:
+            state[url] = record
+            save_crawl_state(state)
+        return folder, record
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(run, queue))
+
+    unfinished = [(folder, record) for folder, record in results if record['status'] != "done"]
+    partial = sum(1 for _, record in unfinished if record['status'] == "partial")
+    print(f"\nCrawl finished: {len(results) - len(unfinished)} leagues done, {partial} partial, "
+          f"{len(unfinished) - partial} failed, {skipped} skipped.")
+    for folder, record in unfinished:
+        detail = f"{record['counts']['failed']} images failed" if record['status'] == "partial" else "failed"
+        print(f"  {detail}: {folder} (rerun to retry)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape league logo walls from sportslogos.net.")
+    parser.add_argument("--crawl", action="store_true",
+                        help="Scrape every league in the leagues file into its Logos/SPORT/LEAGUE folder.")
+    parser.add_argument("--leagues", default=LEAGUES_FILE,
+                        help="JSON list of {\"url\", \"folder\"} (folder relative to Logos/).")
+    parser.add_argument("--workers", type=int, default=LEAGUE_WORKERS, help="Leagues crawled at once.")
+    parser.add_argument("--restart", action="store_true", help="Ignore scrape_state.json and crawl every league again.")
+    parser.add_argument("--url", default=DEFAULT_LEAGUE_URL, help="Single league page to scrape (without --crawl).")
+    parser.add_argument("--folder", default="", help="Folder under Logos/ for --url (default: the Logos/ root).")
+    args = parser.parse_args()
+
+    if args.crawl:
+        leagues = load_json_file(args.leagues, [])
+        if not leagues:
+            print(f"No leagues listed in {args.leagues}.")
+            return
+        crawl(leagues, workers=args.workers, restart=args.restart)
+    else:
+        download_logos(args.url, os.path.join(LOGOS_DIR, *args.folder.strip("/").split("/")) if args.folder else LOGOS_DIR)
+
 if __name__ == "__main__":
-    download_logos()
+    main()
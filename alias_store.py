@@ -0,0 +1,205 @@
+import os
+import csv
+import json
+import time
+import argparse
+import threading
+from pathlib import Path, PureWindowsPath
+
+from candidate_index import simplify_text
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+ALIAS_FILE = BASE_DIR / "alias_store.json"
+UNDO_LOG_FILE = BASE_DIR / "undo_log.json"
+CUSTOM_MAP_FILE = BASE_DIR / "custom_mappings.json"
+CSV_FILE = BASE_DIR / "logo.csv"
+
+# logo.csv uses a few sport IDs that differ from the API ones used by Normalize.py
+CSV_SPORT_ALIASES = {"UFC": "MMA"}
+CSV_CONFIRMED_STATUSES = ("DONE", "✅")
+
+# Sources whose official name is a rename target we already applied or a human chose.
+# Anything else (logo.csv) must resolve through the live catalog before it is used.
+TRUSTED_SOURCES = {"normalize", "review", "custom_mappings", "undo_log"}
+
+
+def alias_key(filename):
+    """'Mainz 05 Logo.gif', 'mainz-05.gif' and 'MAINZ_05.png' all share one key."""
+    stem = Path(filename).stem.lower().replace(" logo", "")
+    return simplify_text(stem.replace("_", " "))
+
+# ==================================================================================
+# STORE
+# ==================================================================================
+class AliasStore:
+    """
+    Persistent raw-name -> official-name memory, namespaced by API sportID.
+    {"aliases": {sport_id: {alias_key: {"official", "source", "trusted", "updated"}}}}
+    """
+
+    def __init__(self, path=ALIAS_FILE):
+        self.path = Path(path)
+        self.aliases = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.aliases is not None:
+                return self
+            self.aliases = {}
+            if self.path.exists():
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self.aliases = json.load(f).get('aliases', {})
+                except Exception as e:
+                    print(f"  [alias_store] Could not read {self.path.name} ({e}), starting empty.")
+        return self
+
+    def lookup(self, sport_id, filename):
+        self.load()
+        return self.aliases.get(sport_id, {}).get(alias_key(filename))
+
+    def record(self, sport_id, raw_name, official, source):
+        """Stores a confirmed pair. An untrusted source never overwrites a trusted entry."""
+        key = alias_key(raw_name)
+        if not key or not official:
+            return False
+        self.load()
+        trusted = source in TRUSTED_SOURCES
+        with self.lock:
+            bucket = self.aliases.setdefault(sport_id, {})
+            existing = bucket.get(key)
+            if existing and existing.get('trusted') and not trusted:
+                return False
+            if existing and existing.get('official') == official and existing.get('trusted') == trusted:
+                return False
+            bucket[key] = {
+                "official": official,
+                "source": source,
+                "trusted": trusted,
+                "updated": time.time()
+            }
+            self.dirty = True
+        return True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"aliases": self.aliases}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def count(self):
+        self.load()
+        return sum(len(bucket) for bucket in self.aliases.values())
+
+# ==================================================================================
+# SEEDING FROM EXISTING GROUND TRUTH
+# ==================================================================================
+def sport_dir_of(path_str):
+    """Sport folder of a logged path (Windows or POSIX, absolute or relative to Logos/)."""
+    parts = PureWindowsPath(path_str).parts if "\\" in path_str else Path(path_str).parts
+    lowered = [p.lower() for p in parts]
+    if "logos" in lowered:
+        idx = lowered.index("logos")
+        return parts[idx + 1] if idx + 1 < len(parts) else None
+    return parts[0] if parts else None
+
+
+def stem_of(path_str):
+    return (PureWindowsPath(path_str) if "\\" in path_str else Path(path_str)).stem
+
+
+def seed(store, sport_dir_map):
+    """Imports undo_log.json, custom_mappings.json and confirmed logo.csv rows. Returns the count added."""
+    added = 0
+    dir_to_sport = {d.lower(): s for d, s in sport_dir_map.items()}
+
+    # undo_log.json: {new_path: old_path} written by Normalize.py
+    if UNDO_LOG_FILE.exists():
+        try:
+            with open(UNDO_LOG_FILE, 'r', encoding='utf-8') as f:
+                for new_path, old_path in json.load(f).items():
+                    sport_id = dir_to_sport.get((sport_dir_of(new_path) or "").lower())
+                    if sport_id and store.record(sport_id, stem_of(old_path), stem_of(new_path), "undo_log"):
+                        added += 1
+        except Exception as e:
+            print(f"  [alias_store] Skipping undo log: {e}")
+
+    # custom_mappings.json: {path: new filename} written by ReviewLogos.py
+    if CUSTOM_MAP_FILE.exists():
+        try:
+            with open(CUSTOM_MAP_FILE, 'r', encoding='utf-8') as f:
+                for path, new_name in json.load(f).items():
+                    sport_id = dir_to_sport.get((sport_dir_of(path) or "").lower())
+                    if sport_id and store.record(sport_id, stem_of(path), Path(new_name).stem, "custom_mappings"):
+                        added += 1
+        except Exception as e:
+            print(f"  [alias_store] Skipping custom mappings: {e}")
+
+    # logo.csv: confirmed rows tie the preferred/current file names and NAME to SGO_FORMAT
+    if CSV_FILE.exists():
+        with open(CSV_FILE, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                status = row.get('STATUS') or ""
+                official = row.get('SGO_FORMAT') or row.get('NAME')
+                if not official or not any(s in status for s in CSV_CONFIRMED_STATUSES):
+                    continue
+                sport_id = CSV_SPORT_ALIASES.get(row.get('SPORT_ID'), row.get('SPORT_ID'))
+                raw_names = [row.get('PREFERRED_FILE_NAME'), row.get('NAME')]
+                if row.get('CURRENT_PATH') and row['CURRENT_PATH'] != "NONE":
+                    raw_names.append(row['CURRENT_PATH'])
+                for raw in raw_names:
+                    if raw and store.record(sport_id, Path(raw).name, official, "logo.csv"):
+                        added += 1
+    return added
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+STORE = AliasStore()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or seed the learned alias memory.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import", help="Import undo_log.json, custom_mappings.json and logo.csv.")
+    show_p = sub.add_parser("show", help="List aliases.")
+    show_p.add_argument("sport_id", nargs="?")
+    forget_p = sub.add_parser("forget", help="Remove one alias.")
+    forget_p.add_argument("sport_id")
+    forget_p.add_argument("raw_name")
+    args = parser.parse_args()
+
+    STORE.load()
+    if args.command == "import":
+        from Normalize import SPORT_DIR_MAP
+        added = seed(STORE, SPORT_DIR_MAP)
+        STORE.save()
+        print(f"Imported {added} aliases ({STORE.count()} total).")
+    elif args.command == "show":
+        for sport_id, bucket in sorted(STORE.aliases.items()):
+            if args.sport_id and sport_id != args.sport_id:
+                continue
+            print(f"{sport_id}:")
+            for key, entry in sorted(bucket.items()):
+                flag = "" if entry.get('trusted') else " (needs catalog)"
+                print(f"  {key:<40} -> {entry['official']}  [{entry['source']}]{flag}")
+    elif args.command == "forget":
+        bucket = STORE.aliases.get(args.sport_id, {})
+        if bucket.pop(alias_key(args.raw_name), None):
+            STORE.dirty = True
+            STORE.save()
+            print("Removed.")
+        else:
+            print("No such alias.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import os
+import csv
+import json
+import math
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from logo_index import INDEX, iter_files
+from standardize import to_rgba, SOURCE_PRIORITY
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+LOGOS_DIR = BASE_DIR / "Logos"
+OUTPUT_DIR = BASE_DIR / "Atlases"
+CSV_FILE = BASE_DIR / "logo.csv"
+
+CELL = int(os.environ.get("ATLAS_CELL", "64"))          # longest edge of each packed logo
+PADDING = int(os.environ.get("ATLAS_PADDING", "2"))     # transparent gap so scaled sprites don't bleed into neighbours
+MAX_EDGE = int(os.environ.get("ATLAS_MAX_EDGE", "4096")) # a folder that doesn't fit one page spills onto more
+WORKERS = int(os.environ.get("ATLAS_WORKERS", "0")) or os.cpu_count() or 1
+FORMAT_VERSION = 1
+
+# ==================================================================================
+# PACKING
+# ==================================================================================
+def pack(sizes, padding=PADDING, max_edge=MAX_EDGE):
+    """
+    Shelf packing, tallest first: rows are filled left to right up to a width near
+    sqrt(total area), then a new row opens below. Returns (pages, placements) where
+    pages is [(width, height)] and placements[i] is (page, x, y) for sizes[i].
+    """
+    if not sizes:
+        return [], []
+    padded = [(w + padding, h + padding) for w, h in sizes]
+    area = sum(w * h for w, h in padded)
+    width = min(max_edge, max(max(w for w, _ in padded), math.ceil(math.sqrt(area) * 1.05)))
+
+    placements = [None] * len(sizes)
+    pages = []
+    page, x, y, shelf_h, used_w = 0, 0, 0, 0, 0
+    for i in sorted(range(len(sizes)), key=lambda i: (-padded[i][1], -padded[i][0])):
+        w, h = padded[i]
+        if x + w > width:
+            x, y, shelf_h = 0, y + shelf_h, 0
+        if y + h > max_edge:
+            pages.append((used_w, y))
+            page, x, y, shelf_h, used_w = page + 1, 0, 0, 0, 0
+        placements[i] = (page, x, y)
+        x += w
+        shelf_h = max(shelf_h, h)
+        used_w = max(used_w, x)
+    pages.append((used_w, y + shelf_h))
+    return pages, placements
+
+# ==================================================================================
+# BUILDING (runs in worker processes)
+# ==================================================================================
+def scaled(img, cell):
+    """Scales to fit a cell x cell box, keeping the aspect ratio; no canvas, so wide logos stay short."""
+    scale = min(cell / img.width, cell / img.height)
+    return img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.LANCZOS)
+
+
+def build_atlas(job):
+    """
+    Decodes one folder's logos, packs them and writes <folder>.png (plus -2, -3... pages)
+    and <folder>.json via temp file + rename. Pages the previous map listed beyond the new
+    page count are deleted once the new map is in place. Returns (folder, frame count, [errors]).
+    """
+    folder, sources, names, signature, cell, output_dir = job
+    base = Path(output_dir) / folder
+    errors = []
+    sprites = []
+    for key, rel_path in sources:
+        try:
+            with Image.open(LOGOS_DIR / rel_path) as img:
+                sprites.append((key, rel_path, scaled(to_rgba(img), cell)))
+        except Exception as e:
+            errors.append(f"{rel_path}: {e}")
+
+    pages, placements = pack([s[2].size for s in sprites])
+    canvases = [Image.new("RGBA", size, (0, 0, 0, 0)) for size in pages]
+    frames = {}
+    for (key, rel_path, sprite), (page, x, y) in zip(sprites, placements):
+        canvases[page].paste(sprite, (x, y))
+        frames[key] = {"page": page, "x": x, "y": y, "w": sprite.width, "h": sprite.height, "file": rel_path}
+
+    base.parent.mkdir(parents=True, exist_ok=True)
+    images = []
+    for page, canvas in enumerate(canvases):
+        out_path = base.with_name(base.name + (f"-{page + 1}" if page else "") + ".png")
+        tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+        canvas.save(tmp_path, format="PNG", optimize=True)
+        os.replace(tmp_path, out_path)
+        images.append({"file": out_path.name, "width": canvas.width, "height": canvas.height})
+
+    atlas_map = {
+        "version": FORMAT_VERSION,
+        "folder": folder,
+        "cell": cell,
+        "signature": signature,
+        "images": images,
+        "frames": frames,
+        "names": {name: key for name, key in names.items() if key in frames}
+    }
+    map_path = base.with_name(base.name + ".json")
+    # Taken from the old map, not by probing for -N.png: a sibling folder may be named like a page
+    stale = {image['file'] for image in read_map(map_path).get('images', [])} - {image['file'] for image in images}
+    tmp_path = map_path.with_name(f".{map_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(atlas_map, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, map_path)
+    for name in stale:
+        (map_path.parent / name).unlink(missing_ok=True)
+    return folder, len(frames), errors
+
+# ==================================================================================
+# PLANNING
+# ==================================================================================
+def folder_sources(folder):
+    """[(frame key, relative path)] for one folder: one source per stem, a.png beating a.gif beating a.jpg."""
+    chosen = {}
+    for rel_path in INDEX.in_folder(folder):
+        suffix = Path(rel_path).suffix.lower()
+        if suffix not in SOURCE_PRIORITY:
+            continue
+        key = Path(rel_path).stem
+        current = chosen.get(key.casefold())
+        if current is None or SOURCE_PRIORITY.index(suffix) < SOURCE_PRIORITY.index(Path(current[1]).suffix.lower()):
+            chosen[key.casefold()] = (key, rel_path)
+    return sorted(chosen.values())
+
+
+def folder_signature(sources, cell):
+    """Changes whenever a logo in the folder is added, removed, renamed or rewritten, or the cell size changes."""
+    h = hashlib.sha256(f"{FORMAT_VERSION}:{cell}:{PADDING}".encode())
+    for _, rel_path in sources:
+        entry = INDEX.get(rel_path)
+        h.update(f"\n{rel_path}\t{entry['size']}\t{entry['mtime']}".encode())
+    return h.hexdigest()
+
+
+def team_names(csv_path=CSV_FILE):
+    """Relative logo path -> [logo.csv NAME], for rows whose PREFERRED_FILE_NAME exists in Logos/."""
+    by_file = {}
+    if not Path(csv_path).exists():
+        return by_file
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row.get('PREFERRED_FILE_NAME') and row.get('NAME'):
+                for rel_path in INDEX.by_stem(row['PREFERRED_FILE_NAME']):
+                    by_file.setdefault(rel_path, []).append(row['NAME'])
+    return by_file
+
+
+def read_map(map_path):
+    """A written atlas map, or {} if there is none (or it can't be read)."""
+    try:
+        with open(map_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def read_signature(folder, output_dir=OUTPUT_DIR):
+    map_path = Path(output_dir) / (folder + ".json")
+    atlas_map = read_map(map_path)
+    if not atlas_map:
+        return None
+    if not all((map_path.parent / image['file']).exists() for image in atlas_map.get('images', [])):
+        return None
+    return atlas_map.get('signature')
+
+
+def plan(subdir="", cell=CELL, force=False, output_dir=OUTPUT_DIR):
+    """Returns (jobs, up_to_date). One job per folder under Logos/ holding images, skipped if its signature is unchanged."""
+    INDEX.load()
+    prefix = subdir.strip("/")
+    names_by_file = team_names()
+    jobs = []
+    up_to_date = 0
+    for folder in sorted(INDEX.folders):
+        if not folder or (prefix and folder != prefix and not folder.startswith(prefix + "/")):
+            continue
+        sources = folder_sources(folder)
+        if not sources:
+            continue
+        signature = folder_signature(sources, cell)
+        if not force and read_signature(folder, output_dir) == signature:
+            up_to_date += 1
+            continue
+        names = {name: key for key, rel_path in sources for name in names_by_file.get(rel_path, [])}
+        jobs.append((folder, sources, names, signature, cell, str(output_dir)))
+    return jobs, up_to_date
+
+
+def prune(output_dir=OUTPUT_DIR):
+    """Deletes atlases whose folder no longer holds any logos. Returns the count of maps removed."""
+    output_dir = Path(output_dir)
+    removed = 0
+    for entry in list(iter_files(output_dir)):
+        if not entry.name.endswith(".json"):
+            continue
+        folder = Path(entry.path).relative_to(output_dir).with_suffix("").as_posix()
+        if folder_sources(folder):
+            continue
+        for name in [image['file'] for image in read_map(entry.path).get('images', [])]:
+            Path(entry.path).with_name(name).unlink(missing_ok=True)
+        os.remove(entry.path)
+        try:
+            Path(entry.path).parent.rmdir() # only succeeds once the folder is empty
+        except OSError:
+            pass
+        removed += 1
+    return removed
+
+
+def run(subdir="", cell=CELL, force=False, workers=WORKERS, output_dir=OUTPUT_DIR):
+    jobs, up_to_date = plan(subdir, cell, force, output_dir)
+    print(f"{len(jobs)} atlases to build, {up_to_date} up to date.")
+    failed = []
+    if jobs:
+        # Biggest folders first so College/Colleges doesn't finish last on a single core
+        jobs.sort(key=lambda job: -len(job[1]))
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+            for folder, count, errors in executor.map(build_atlas, jobs):
+                print(f"  {folder}: {count} logos")
+                for error in errors:
+                    failed.append(error)
+                    print(f"    [ERR] {error}")
+    print(f"Done: {len(jobs)} atlases written to {output_dir}, {len(failed)} logos could not be read.")
+    return jobs, failed
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Pack each league folder's logos into one sprite sheet plus a JSON coordinate map.")
+    parser.add_argument("subdir", nargs="?", default="", help="Folder under Logos/ (default: everything).")
+    parser.add_argument("--cell", type=int, default=CELL, help="Longest edge of each logo in the atlas.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Worker processes (default: all cores).")
+    parser.add_argument("--force", action="store_true", help="Rebuild atlases even if their folder hasn't changed.")
+    parser.add_argument("--prune", action="store_true", help="Delete atlases whose folder no longer exists.")
+    args = parser.parse_args()
+
+    run(args.subdir, args.cell, args.force, args.workers)
+    if args.prune:
+        print(f"Pruned {prune()} stale atlases.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import os
+import json
+import shutil
+import argparse
+import threading
+from pathlib import Path
+
+from logo_index import INDEX
+from manifest import MANIFEST, hash_file
+from rename_history import append_run, read_history, summarize_runs, pending_entries
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+LOGOS_DIR = BASE_DIR / "Logos"
+BLOBS_DIR = BASE_DIR / "Blobs"
+NAMES_FILE = BLOBS_DIR / "names.json"
+HISTORY_FILE = BLOBS_DIR / "history.jsonl"
+# Hard-link blobs to their Logos/ files instead of copying them (0 = private read-only copies)
+LINK_BLOBS = os.environ.get("BLOB_STORE_LINKS", "1") != "0"
+
+# ==================================================================================
+# STORE
+# ==================================================================================
+class BlobStore:
+    """
+    Image bytes stored once under their sha256 (Blobs/objects/ab/<sha256><ext>), plus a
+    name layer mapping logical paths such as 'Soccer/Germany Bundesliga/augsburg.gif'
+    (sport/league/entity file, the same shape as Logos/ and PREFERRED_FILE_PATH) to blobs.
+
+    Renames and undos only edit the name layer; blobs are deleted only by gc() when no name
+    points at them. Duplicate logos share a blob.
+
+    Limitation: a blob hard-linked to its Logos/ file (the default, see LINK_BLOBS) is the same
+    inode, so it is only immutable as long as nobody writes into that file in place. Every tool
+    here replaces files (temp file + rename), which leaves the blob alone; anything else that
+    edits a logo in place silently changes the blob under its old sha256. Set
+    BLOB_STORE_LINKS=0 to store private read-only copies instead.
+
+    Logos/ is still the tree the other tools read, so Normalize.py, renamer_agent.py and
+    the rename undo still move files there and only mirror the move into the name layer.
+    """
+
+    def __init__(self, root=BLOBS_DIR):
+        self.root = Path(root)
+        self.names_path = self.root / NAMES_FILE.name
+        self.history_path = self.root / HISTORY_FILE.name
+        self.names = None   # logical name -> sha256
+        self.blobs = {}     # sha256 -> {"ext", "size"}
+        self.folded = {}    # casefold(name) -> name
+        self.dirty = False
+        self.lock = threading.RLock()
+
+    def load(self):
+        with self.lock:
+            if self.names is not None:
+                return self
+            self.names, self.blobs = {}, {}
+            if self.names_path.exists():
+                try:
+                    with open(self.names_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    self.names, self.blobs = data.get('names', {}), data.get('blobs', {})
+                except Exception as e:
+                    print(f"  [blobs] Could not read {self.names_path.name} ({e}), starting empty.")
+            self.folded = {name.casefold(): name for name in self.names}
+        return self
+
+    def active(self):
+        """True once the store has been initialized with 'import'; until then the rename hooks are no-ops."""
+        return bool(self.load().names) or self.names_path.exists()
+
+    @staticmethod
+    def name(path):
+        """Logical name for a path under Logos/ (absolute or relative); None for anything outside it."""
+        return INDEX.rel(path)
+
+    def blob_path(self, digest):
+        blob = self.blobs[digest]
+        return self.root / "objects" / digest[:2] / f"{digest}{blob['ext']}"
+
+    # ------------------------------------------------------------------
+    # Writing blobs
+    # ------------------------------------------------------------------
+    def store(self, source, digest=None):
+        """
+        Puts a file's bytes into the store (once per content) and returns its sha256. With
+        LINK_BLOBS the blob is hard-linked to the source where the filesystem allows, as
+        checkout does, so a logo imported from Logos/ is not held twice (see the class
+        docstring for what that costs). Otherwise the bytes are copied and made read-only.
+        """
+        self.load()
+        digest = digest or hash_file(source)
+        with self.lock:
+            if digest in self.blobs and self.blob_path(digest).exists():
+                return digest
+            self.blobs[digest] = {"ext": Path(source).suffix.lower(), "size": os.path.getsize(source)}
+            self.dirty = True
+            path = self.blob_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            if not LINK_BLOBS:
+                raise OSError("linking disabled")
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+            # Only a private copy is made read-only; a link shares its mode with the file in Logos/
+            os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, path)
+        return digest
+
+    def bind(self, name, digest):
+        with self.lock:
+            self.load()
+            old = self.folded.get(name.casefold())
+            if old is not None and old != name:
+                del self.names[old]
+            self.names[name] = digest
+            self.folded[name.casefold()] = name
+            self.dirty = True
+
+    def put(self, name, source):
+        """Stores `source` and points `name` at it."""
+        digest = self.store(source)
+        self.bind(name, digest)
+        return digest
+
+    def import_tree(self, prune=False):
+        """
+        Brings Logos/ into the store: every file's bytes become a blob, hard-linked rather than
+        copied where possible (hashes come from the file manifest, so unchanged files are not
+        re-read), and its relative path a name.
+        With prune, names whose file is no longer in Logos/ are dropped.
+        Returns (new blobs, names bound, names dropped).
+        """
+        self.load()
+        known = set(self.blobs)
+        bound = 0
+        seen = set()
+        for rel_path in INDEX.all_files():
+            digest = self.store(LOGOS_DIR / rel_path, MANIFEST.digest(LOGOS_DIR / rel_path))
+            seen.add(rel_path)
+            if self.names.get(rel_path) != digest:
+                self.bind(rel_path, digest)
+                bound += 1
+        MANIFEST.save()
+        dropped = 0
+        if prune:
+            for name in [n for n in self.names if n not in seen]:
+                self.unbind(name)
+                dropped += 1
+        return len(set(self.blobs) - known), bound, dropped
+
+    # ------------------------------------------------------------------
+    # Name layer
+    # ------------------------------------------------------------------
+    def resolve(self, name):
+        """Blob path for a logical name (case-insensitive), or None."""
+        self.load()
+        with self.lock:
+            actual = self.folded.get(str(name).strip("/").casefold())
+            if actual is None:
+                return None
+            return self.blob_path(self.names[actual])
+
+    def unbind(self, name):
+        with self.lock:
+            self.load()
+            actual = self.folded.pop(name.casefold(), None)
+            if actual is not None:
+                del self.names[actual]
+                self.dirty = True
+            return actual
+
+    def rename(self, old, new):
+        """Moves a name to another name. Returns None, or why it could not be done."""
+        with self.lock:
+            self.load()
+            actual = self.folded.get(old.casefold())
+            if actual is None:
+                return "missing"
+            taken = self.folded.get(new.casefold())
+            if taken is not None and taken != actual:
+                return "name is taken"
+            digest = self.names.pop(actual)
+            del self.folded[actual.casefold()]
+            self.names[new] = digest
+            self.folded[new.casefold()] = new
+            self.dirty = True
+            return None
+
+    def rename_many(self, pairs, tool="blob_store.py", kind="rename", undoes=None):
+        """Applies (old, new) name edits in order and records the ones that landed. Returns (done, failed)."""
+        done, failed = [], []
+        for old, new in pairs:
+            error = self.rename(old, new)
+            if error:
+                failed.append(((old, new), error))
+            else:
+                done.append((old, new))
+        append_run(tool, done, kind=kind, undoes=undoes, history_path=self.history_path)
+        self.save()
+        return done, failed
+
+    def follow_rename(self, old_path, new_path):
+        """Hook for tools that still move files in Logos/: keeps the name layer pointing at the same bytes."""
+        if not self.active():
+            return
+        old, new = self.name(old_path), self.name(new_path)
+        if old is not None and new is not None:
+            self.rename(old, new)
+
+    def gc(self):
+        """Deletes blobs no name points at. Returns (count, bytes freed)."""
+        with self.lock:
+            self.load()
+            live = set(self.names.values())
+            dead = [d for d in self.blobs if d not in live]
+            freed = 0
+            for digest in dead:
+                path = self.blob_path(digest)
+                freed += self.blobs[digest]['size']
+                try:
+                    os.chmod(path, 0o644)
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                del self.blobs[digest]
+            if dead:
+                self.dirty = True
+        return len(dead), freed
+
+    def checkout(self, dest, subdir=""):
+        """
+        Materializes the logical tree (or part of it) under `dest` for consumers that need
+        plain folders, hard-linking blobs where the filesystem allows. Returns the file count.
+        """
+        self.load()
+        prefix = subdir.strip("/") + "/" if subdir else ""
+        with self.lock:
+            items = [(n, self.blob_path(d)) for n, d in self.names.items() if n.startswith(prefix)]
+        for name, blob in items:
+            target = Path(dest) / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.unlink(missing_ok=True)
+            try:
+                os.link(blob, target)
+            except OSError:
+                shutil.copyfile(blob, target)
+        return len(items)
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or self.names is None:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.names_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"names": self.names, "blobs": self.blobs}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.names_path)
+            self.dirty = False
+
+    def stats(self):
+        self.load()
+        with self.lock:
+            stored = sum(b['size'] for b in self.blobs.values())
+            logical = sum(self.blobs[d]['size'] for d in self.names.values() if d in self.blobs)
+            return len(self.names), len(self.blobs), stored, logical
+
+
+BLOBS = BlobStore()
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed logo storage with a logical name layer.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_p = sub.add_parser("import", help="Store every file under Logos/ and bind its path as a name.")
+    import_p.add_argument("--prune", action="store_true", help="Drop names whose file left Logos/.")
+    sub.add_parser("stats", help="Names, blobs and the space deduplication saves.")
+    resolve_p = sub.add_parser("resolve", help="Print the blob behind a name.")
+    resolve_p.add_argument("name")
+    mv_p = sub.add_parser("mv", help="Rename a name (metadata only; Logos/ is not touched).")
+    mv_p.add_argument("old")
+    mv_p.add_argument("new")
+    sub.add_parser("list-runs", help="List recorded name edits.")
+    undo_p = sub.add_parser("undo", help="Revert the last (or a given) run of name edits.")
+    undo_p.add_argument("--run")
+    sub.add_parser("gc", help="Delete blobs no name points at.")
+    checkout_p = sub.add_parser("checkout", help="Write the logical tree out as plain folders.")
+    checkout_p.add_argument("dest")
+    checkout_p.add_argument("--subdir", default="")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        added, bound, dropped = BLOBS.import_tree(args.prune)
+        BLOBS.save()
+        print(f"{added} new blobs, {bound} names bound, {dropped} dropped.")
+    elif args.command == "stats":
+        names, blobs, stored, logical = BLOBS.stats()
+        print(f"{names} names -> {blobs} blobs, {stored / 1024 / 1024:.1f} MiB stored "
+              f"for {logical / 1024 / 1024:.1f} MiB of logical files.")
+    elif args.command == "resolve":
+        print(BLOBS.resolve(args.name) or "No such name.")
+    elif args.command == "mv":
+        _, failed = BLOBS.rename_many([(args.old, args.new)])
+        print(f"Failed: {failed[0][1]}" if failed else "Renamed.")
+    elif args.command == "list-runs":
+        for run_id, tool, kind, _, count in summarize_runs(read_history(BLOBS.history_path)):
+            print(f"  {run_id:<24} {kind:<7} {tool:<18} {count:>5} entries")
+    elif args.command == "undo":
+        records = read_history(BLOBS.history_path)
+        run_id = args.run
+        if not run_id:
+            live = [r for r in summarize_runs(records) if r[2] == "rename" and pending_entries(records, r[0])]
+            run_id = live[-1][0] if live else None
+        entries = pending_entries(records, run_id) if run_id else []
+        done, failed = BLOBS.rename_many([(e["new"], e["old"]) for e in reversed(entries)], kind="undo", undoes=run_id)
+        print(f"{len(done)} reverted, {len(failed)} failed.")
+    elif args.command == "gc":
+        count, freed = BLOBS.gc()
+        BLOBS.save()
+        print(f"Removed {count} blobs ({freed / 1024:.0f} KiB).")
+    elif args.command == "checkout":
+        print(f"Wrote {BLOBS.checkout(args.dest, args.subdir)} files to {args.dest}.")
+
+if __name__ == "__main__":
+    main()
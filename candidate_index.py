@@ -0,0 +1,83 @@
+import re
+import math
+import unicodedata
+from collections import defaultdict
+
+# Words that appear in most filenames/entity names and carry no signal
+STOP_WORDS = {"logo", "logos", "the", "fc", "cf", "sc", "club", "de", "of", "gif", "png", "jpg", "jpeg"}
+
+
+def simplify_text(text):
+    """Lowercase, strip accents and collapse everything that isn't a letter or digit to spaces."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def features(text):
+    """Word tokens plus character trigrams, so 'Cardinals' still finds 'St. Louis Cardinals' and typos overlap."""
+    words = [w for w in simplify_text(text).split() if w not in STOP_WORDS]
+    feats = set(words)
+    for word in words:
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            feats.add("#" + padded[i:i + 3])
+    return feats
+
+
+def entity_texts(entity):
+    """All the name variants of a SportsGameOdds team or league worth matching against."""
+    if 'teamID' in entity:
+        names = entity.get('names', {})
+        # leagueID too, as for leagues, so a file named after its league still finds the team
+        texts = [names.get('short'), names.get('medium'), names.get('long'), names.get('location'),
+                 entity.get('leagueID')]
+        if names.get('location') and names.get('medium'):
+            texts.append(f"{names['location']} {names['medium']}")
+    else:
+        texts = [entity.get('name'), entity.get('shortName'), entity.get('leagueID')]
+    return [t for t in texts if t]
+
+
+class CandidateIndex:
+    """
+    Inverted index over an entity catalog for cheap top-k retrieval.
+
+    Scoring is an IDF-weighted cosine over word and trigram features. It only has
+    to put the right entity in the top k, because the LLM makes the final call.
+    """
+
+    def __init__(self, entities):
+        self.entities = list(entities)
+        self.postings = defaultdict(list)
+        entity_feats = []
+        for i, entity in enumerate(self.entities):
+            feats = set()
+            for text in entity_texts(entity):
+                feats |= features(text)
+            entity_feats.append(feats)
+            for feat in feats:
+                self.postings[feat].append(i)
+
+        n = max(1, len(self.entities))
+        self.idf = {feat: math.log(1 + n / len(ids)) for feat, ids in self.postings.items()}
+        self.norms = [math.sqrt(sum(self.idf[f] ** 2 for f in feats)) or 1.0 for feats in entity_feats]
+
+    def top_k(self, query, k=15):
+        """Returns the indexes of the k best-scoring entities for `query`, best first."""
+        scores = defaultdict(float)
+        query_feats = [f for f in features(query) if f in self.postings]
+        for feat in query_feats:
+            weight = self.idf[feat] ** 2
+            for i in self.postings[feat]:
+                scores[i] += weight
+        ranked = sorted(scores, key=lambda i: (-scores[i] / self.norms[i], i))
+        return ranked[:k]
+
+    def candidates_for(self, queries, k=15):
+        """Union of the top-k entities of every query, in first-seen order (deterministic prompts)."""
+        seen = {}
+        for query in queries:
+            for i in self.top_k(query, k):
+                seen.setdefault(i, None)
+        return [self.entities[i] for i in seen]
@@ -0,0 +1,221 @@
+import os
+import io
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+from manifest import MANIFEST
+from standardize import to_rgba, fit_box
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+LOGOS_DIR = BASE_DIR / "Logos"
+CACHE_DIR = BASE_DIR / ".derivatives"
+INDEX_FILE = CACHE_DIR / "index.json"
+
+MAX_BYTES = int(os.environ.get("DERIVATIVE_CACHE_BYTES", str(256 * 1024 * 1024)))
+MAX_EDGE = 2048 # largest width/height anyone may ask for
+FORMATS = {"png": "PNG", "webp": "WEBP", "jpeg": "JPEG", "jpg": "JPEG"}
+
+# ==================================================================================
+# KEYS
+# ==================================================================================
+def derivative_key(digest, width, height, fmt):
+    """(source content hash, width, height, format). Renaming the source doesn't change it."""
+    return f"{digest}_{width}x{height}.{fmt}"
+
+
+def render(source, width, height, fmt):
+    """Encodes one variant of `source` and returns its bytes."""
+    with Image.open(source) as img:
+        canvas = fit_box(to_rgba(img), width, height)
+    if FORMATS[fmt] == "JPEG":
+        # No alpha in JPEG: flatten onto white
+        flat = Image.new("RGB", canvas.size, (255, 255, 255))
+        flat.paste(canvas, mask=canvas.getchannel("A"))
+        canvas = flat
+    buf = io.BytesIO()
+    canvas.save(buf, format=FORMATS[fmt], optimize=True)
+    return buf.getvalue()
+
+# ==================================================================================
+# CACHE
+# ==================================================================================
+class DerivativeCache:
+    """
+    On-disk cache of resized logo variants, generated on first request.
+
+    Entries: key -> {"file", "bytes", "created", "last_used"}, evicted least recently
+    used first once the total passes `max_bytes`. Keys are content addressed, so a
+    renamed source keeps its variants and an edited one simply gets new keys (the old
+    ones age out). Thread-safe; concurrent requests for the same variant render it once.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.index_path = self.cache_dir / INDEX_FILE.name
+        self.max_bytes = max_bytes
+        self.entries = None
+        self.total = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.rendering = {} # key -> lock held while that variant is being generated
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"  [derivatives] Could not read {self.index_path.name} ({e}), starting empty.")
+        # Drop entries whose file went missing
+        for key in [k for k, e in self.entries.items() if not (self.cache_dir / e['file']).exists()]:
+            del self.entries[key]
+            self.dirty = True
+        self.total = sum(e['bytes'] for e in self.entries.values())
+
+    def lookup(self, key):
+        """Path of a cached variant (marking it recently used), or None."""
+        with self.lock:
+            self._load()
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            entry['last_used'] = time.time()
+            self.dirty = True
+            return self.cache_dir / entry['file']
+
+    def get(self, source, width, height=None, fmt="png"):
+        """Path to the width x height `fmt` variant of `source`, rendering and caching it if needed."""
+        height = height or width
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt}")
+        if not (0 < width <= MAX_EDGE and 0 < height <= MAX_EDGE):
+            raise ValueError(f"Size must be between 1 and {MAX_EDGE}")
+
+        key = derivative_key(MANIFEST.digest(source), width, height, fmt)
+        path = self.lookup(key)
+        if path is not None:
+            return path
+
+        with self.lock:
+            key_lock = self.rendering.setdefault(key, threading.Lock())
+        with key_lock:
+            # Someone else may have finished it while we waited
+            path = self.lookup(key)
+            if path is None:
+                path = self._store(key, render(source, width, height, fmt))
+        with self.lock:
+            self.rendering.pop(key, None)
+        return path
+
+    def _store(self, key, data):
+        rel_file = f"{key[:2]}/{key}"
+        path = self.cache_dir / rel_file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self.lock:
+            self._load()
+            old = self.entries.get(key)
+            if old:
+                self.total -= old['bytes']
+            self.entries[key] = {"file": rel_file, "bytes": len(data), "created": now, "last_used": now}
+            self.total += len(data)
+            self.dirty = True
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep=None):
+        """Removes least recently used variants until the total fits the budget."""
+        if self.total <= self.max_bytes:
+            return 0
+        removed = 0
+        for key in sorted(self.entries, key=lambda k: self.entries[k]['last_used']):
+            if self.total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            entry = self.entries.pop(key)
+            self.total -= entry['bytes']
+            try:
+                os.remove(self.cache_dir / entry['file'])
+            except FileNotFoundError:
+                pass
+            removed += 1
+        return removed
+
+    def trim(self, max_bytes=None):
+        with self.lock:
+            self._load()
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            removed = self._evict()
+            if removed:
+                self.dirty = True
+        self.save()
+        return removed
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or self.entries is None:
+                return
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+
+    def stats(self):
+        with self.lock:
+            self._load()
+            return len(self.entries), self.total
+
+
+CACHE = DerivativeCache()
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Resized logo variants, cached by content hash.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    get_p = sub.add_parser("get", help="Print the cached path of a variant, rendering it if needed.")
+    get_p.add_argument("path", help="Logo path, relative to Logos/ or absolute.")
+    get_p.add_argument("width", type=int)
+    get_p.add_argument("height", type=int, nargs="?")
+    get_p.add_argument("--format", default="png", choices=sorted(FORMATS))
+    sub.add_parser("stats", help="Entry count and size against the budget.")
+    trim_p = sub.add_parser("trim", help="Evict least recently used variants down to the budget.")
+    trim_p.add_argument("--max-mb", type=float, help="Budget to trim to (default: DERIVATIVE_CACHE_BYTES).")
+    args = parser.parse_args()
+
+    if args.command == "get":
+        source = Path(args.path) if Path(args.path).is_absolute() else LOGOS_DIR / args.path
+        print(CACHE.get(source, args.width, args.height, args.format))
+        CACHE.save()
+        MANIFEST.save()
+    elif args.command == "stats":
+        count, total = CACHE.stats()
+        print(f"{count} variants, {total / 1024 / 1024:.1f} MiB of {CACHE.max_bytes / 1024 / 1024:.0f} MiB budget.")
+    elif args.command == "trim":
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        print(f"Evicted {CACHE.trim(max_bytes)} variants.")
+
+if __name__ == "__main__":
+    main()
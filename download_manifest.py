@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+
+from manifest import MANIFEST
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+LOGOS_DIR = BASE_DIR / "Logos"
+DOWNLOAD_MANIFEST_FILE = BASE_DIR / "download_manifest.json"
+
+# ==================================================================================
+# MANIFEST
+# ==================================================================================
+class DownloadManifest:
+    """
+    URL -> {path, etag, last_modified, sha256, size, fetched} for every scraped image.
+
+    The validators drive conditional GETs on the next run, and the content hashes
+    let a download that matches a file we already have be skipped instead of written.
+    Paths here are the ones the scraper wrote; once Normalize renames a file, its bytes
+    are still found through the file manifest's hashes, which follow renames.
+    """
+
+    def __init__(self, path=DOWNLOAD_MANIFEST_FILE, root=LOGOS_DIR):
+        self.path = Path(path)
+        self.root = Path(root)
+        self.urls = None
+        self.by_hash = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.urls is not None:
+                return self
+            self.urls = {}
+            if self.path.exists():
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self.urls = json.load(f).get('urls', {})
+                except Exception as e:
+                    print(f"  [downloads] Could not read {self.path.name} ({e}), starting empty.")
+            for entry in self.urls.values():
+                if entry.get('sha256'):
+                    self.by_hash.setdefault(entry['sha256'], entry['path'])
+        return self
+
+    def rel(self, path):
+        path = Path(os.path.abspath(path))
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def conditional_headers(self, url, file_path):
+        """
+        If-None-Match / If-Modified-Since for a URL whose file (or the copy it duplicates) is
+        still there, under its scraped name or any name it was renamed to since.
+        """
+        self.load()
+        with self.lock:
+            entry = self.urls.get(url)
+        if not entry or entry.get('path') != self.rel(file_path):
+            return {}
+        if not (self.root / (entry.get('duplicate_of') or entry['path'])).exists() \
+                and not (entry.get('sha256') and MANIFEST.holders(entry['sha256'])):
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers["If-None-Match"] = entry['etag']
+        if entry.get('last_modified'):
+            headers["If-Modified-Since"] = entry['last_modified']
+        return headers
+
+    def existing_copy(self, url, digest, file_path):
+        """
+        Where these bytes already live on disk: 'same' if file_path itself holds them,
+        the other file's relative path if a different file does, else None. Files the
+        scraper didn't write, or that were renamed after it did, are found by hash in
+        the file manifest.
+        """
+        self.load()
+        rel_path = self.rel(file_path)
+        with self.lock:
+            known = self.by_hash.get(digest)
+            own = self.urls.get(url)
+        if own and own.get('path') == rel_path and own.get('sha256') == digest and not own.get('duplicate_of') \
+                and os.path.exists(file_path):
+            return "same"
+        if known and known != rel_path and (self.root / known).exists():
+            return known
+        holders = MANIFEST.holders(digest)
+        if holders:
+            return "same" if rel_path in holders else holders[0]
+        return None
+
+    def record(self, url, file_path, response_headers, digest, size, duplicate_of=None):
+        self.load()
+        entry = {
+            "path": self.rel(file_path),
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "sha256": digest,
+            "size": size,
+            "fetched": time.time()
+        }
+        if duplicate_of:
+            entry["duplicate_of"] = duplicate_of
+        with self.lock:
+            self.urls[url] = entry
+            if not duplicate_of:
+                self.by_hash[digest] = entry['path']
+            self.dirty = True
+
+    def touch(self, url):
+        """Notes a 304: the stored copy was confirmed current."""
+        self.load()
+        with self.lock:
+            if url in self.urls:
+                self.urls[url]['fetched'] = time.time()
+                self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"urls": self.urls}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+
+DOWNLOADS = DownloadManifest()
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the scraper's download manifest.")
+    parser.add_argument("command", choices=["stats", "forget"])
+    parser.add_argument("url", nargs="?", help="URL to forget (forces a full re-download next run).")
+    args = parser.parse_args()
+
+    DOWNLOADS.load()
+    if args.command == "stats":
+        entries = DOWNLOADS.urls.values()
+        validated = sum(1 for e in entries if e.get('etag') or e.get('last_modified'))
+        duplicates = sum(1 for e in entries if e.get('duplicate_of'))
+        print(f"{len(DOWNLOADS.urls)} URLs tracked, {validated} with validators, {duplicates} duplicates, "
+              f"{len(DOWNLOADS.by_hash)} distinct images.")
+    elif args.command == "forget":
+        if args.url and DOWNLOADS.urls.pop(args.url, None):
+            DOWNLOADS.dirty = True
+            DOWNLOADS.save()
+            print("Removed.")
+        else:
+            print("No such URL.")
+
+if __name__ == "__main__":
+    main()
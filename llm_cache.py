@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+CACHE_FILE = BASE_DIR / "llm_cache.json"
+
+MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "20000"))
+DISABLED = os.environ.get("LLM_CACHE_DISABLED", "") == "1"
+
+# ==================================================================================
+# KEYS
+# ==================================================================================
+def fingerprint(obj):
+    """Stable sha256 of any JSON-serialisable value (key order independent)."""
+    blob = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def make_key(model, prompt_version, item, candidates_fingerprint):
+    """
+    Content address for one LLM decision.
+    Any change to the model, the prompt template, the queried item or the candidate
+    set produces a new key, so stale answers are never served.
+    """
+    return fingerprint([model, prompt_version, item, candidates_fingerprint])
+
+# ==================================================================================
+# CACHE
+# ==================================================================================
+class LLMCache:
+    """
+    JSON-backed cache of LLM match results with least-recently-used eviction.
+
+    Entries: key -> {"value", "label", "source", "created", "last_used"}.
+    Thread-safe; callers save() after each successful request so a crash loses at most one batch.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.entries = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"  [llm_cache] Could not read {self.path.name} ({e}), starting empty.")
+
+    def get(self, key):
+        if DISABLED:
+            return None
+        with self.lock:
+            self._load()
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            entry['last_used'] = time.time()
+            self.dirty = True
+            return entry['value']
+
+    def put(self, key, value, label="", source=""):
+        if DISABLED:
+            return
+        with self.lock:
+            self._load()
+            now = time.time()
+            self.entries[key] = {
+                "value": value,
+                "label": label,
+                "source": source,
+                "created": now,
+                "last_used": now
+            }
+            self.dirty = True
+            self._evict()
+
+    def _evict(self):
+        overflow = len(self.entries) - self.max_entries
+        if overflow <= 0:
+            return
+        oldest = sorted(self.entries, key=lambda k: self.entries[k].get('last_used', 0))[:overflow]
+        for key in oldest:
+            del self.entries[key]
+
+    def save(self):
+        with self.lock:
+            if not self.dirty or self.entries is None:
+                return
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def purge(self, predicate):
+        """Removes every entry for which predicate(key, entry) is true. Returns the count."""
+        with self.lock:
+            self._load()
+            doomed = [k for k, e in self.entries.items() if predicate(k, e)]
+            for key in doomed:
+                del self.entries[key]
+            if doomed:
+                self.dirty = True
+        self.save()
+        return len(doomed)
+
+    def items(self):
+        with self.lock:
+            self._load()
+            return list(self.entries.items())
+
+
+CACHE = LLMCache()
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or purge the LLM match cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("stats", help="Entry counts per source and file size.")
+
+    list_p = sub.add_parser("list", help="List cached decisions.")
+    list_p.add_argument("--source", help="Only entries whose source starts with this (e.g. normalize:Soccer).")
+    list_p.add_argument("--match", help="Only entries whose label contains this text.")
+
+    purge_p = sub.add_parser("purge", help="Delete cached decisions.")
+    purge_p.add_argument("--all", action="store_true")
+    purge_p.add_argument("--source", help="Entries whose source starts with this.")
+    purge_p.add_argument("--match", help="Entries whose label contains this text.")
+    purge_p.add_argument("--older-than-days", type=float, help="Entries not used for this many days.")
+
+    args = parser.parse_args()
+
+    def selected(entry):
+        if getattr(args, 'source', None) and not entry.get('source', '').startswith(args.source):
+            return False
+        if getattr(args, 'match', None) and args.match.lower() not in entry.get('label', '').lower():
+            return False
+        return True
+
+    if args.command == "stats":
+        items = CACHE.items()
+        by_source = {}
+        for _, entry in items:
+            by_source[entry.get('source', '')] = by_source.get(entry.get('source', ''), 0) + 1
+        size = CACHE.path.stat().st_size if CACHE.path.exists() else 0
+        print(f"{len(items)} entries ({size / 1024:.1f} KiB, limit {CACHE.max_entries})")
+        for source, count in sorted(by_source.items()):
+            print(f"  {source or '(none)':<30} {count}")
+
+    elif args.command == "list":
+        for key, entry in sorted(CACHE.items(), key=lambda kv: kv[1].get('label', '')):
+            if selected(entry):
+                print(f"{key[:12]}  {entry.get('source', ''):<24} {entry.get('label', '')} -> {json.dumps(entry['value'])[:120]}")
+
+    elif args.command == "purge":
+        if not (args.all or args.source or args.match or args.older_than_days):
+            parser.error("purge needs --all, --source, --match or --older-than-days")
+        cutoff = time.time() - (args.older_than_days or 0) * 86400
+
+        def doomed(key, entry):
+            if args.all:
+                return True
+            if args.older_than_days and entry.get('last_used', 0) >= cutoff:
+                return False
+            return selected(entry)
+
+        print(f"Purged {CACHE.purge(doomed)} entries.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import os
+import argparse
+import threading
+from pathlib import Path
+
+from candidate_index import simplify_text
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+LOGOS_DIR = BASE_DIR / "Logos"
+
+
+def is_logo_file(name):
+    """Same filter every tool uses: skip dotfiles and desktop.ini style leftovers."""
+    return not (name.startswith('.') or name.lower().endswith('.ini'))
+
+
+def iter_files(root):
+    """Yields os.DirEntry objects for every logo file under root (scandir, no extra stats)."""
+    stack = [Path(root)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False) and is_logo_file(entry.name):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def stem_key(path_or_name):
+    """'Mainz 05 Logo.gif', 'mainz-05.gif' and 'Mainz_05.png' all reduce to 'mainz 05'."""
+    stem = Path(path_or_name).stem.lower().replace("_", " ")
+    if stem.endswith(" logo"):
+        stem = stem[:-5]
+    return simplify_text(stem)
+
+# ==================================================================================
+# INDEX
+# ==================================================================================
+class LogoIndex:
+    """
+    In-memory view of every logo file under Logos/, built with one scandir pass.
+
+    Keyed by relative posix path ({size, mtime}), with secondary lookups by
+    case-folded path, normalized stem, sport folder and containing folder. Tools
+    call rename()/add()/remove() as they change the tree, so it never has to be
+    walked again and existence checks are dictionary hits instead of stat() calls.
+    """
+
+    def __init__(self, root=LOGOS_DIR):
+        self.root = Path(root)
+        self.files = None
+        self.folded = {}    # casefold(rel) -> rel
+        self.stems = {}     # stem_key -> {rel}
+        self.folders = {}   # parent rel -> {rel}
+        self.sports = {}    # first folder -> {rel}
+        self.version = 0    # bumped on every change; callers cache derived views against it
+        self._sorted = (None, [])
+        self.lock = threading.RLock()
+
+    def load(self):
+        with self.lock:
+            if self.files is None:
+                self._scan()
+        return self
+
+    def refresh(self):
+        """Rebuilds from disk, for changes made by something that doesn't update the index."""
+        with self.lock:
+            self._scan()
+        return self
+
+    def _scan(self):
+        self.files, self.folded, self.stems, self.folders, self.sports = {}, {}, {}, {}, {}
+        for entry in iter_files(self.root):
+            stat = entry.stat()
+            self._insert(self.rel(entry.path), stat.st_size, stat.st_mtime)
+        self.version += 1
+
+    def rel(self, path):
+        """Relative posix path under the root, or None for paths outside it."""
+        path = Path(path)
+        if not path.is_absolute():
+            return path.as_posix()
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+
+    def _insert(self, rel_path, size, mtime):
+        self.files[rel_path] = {"size": size, "mtime": mtime}
+        self.folded[rel_path.casefold()] = rel_path
+        parent, _, name = rel_path.rpartition("/")
+        self.stems.setdefault(stem_key(name), set()).add(rel_path)
+        self.folders.setdefault(parent, set()).add(rel_path)
+        self.sports.setdefault(rel_path.split("/")[0] if parent else "", set()).add(rel_path)
+
+    def _discard(self, rel_path):
+        entry = self.files.pop(rel_path, None)
+        if entry is None:
+            return None
+        self.folded.pop(rel_path.casefold(), None)
+        parent, _, name = rel_path.rpartition("/")
+        for table, key in ((self.stems, stem_key(name)), (self.folders, parent),
+                           (self.sports, rel_path.split("/")[0] if parent else "")):
+            bucket = table.get(key)
+            if bucket is not None:
+                bucket.discard(rel_path)
+                if not bucket:
+                    del table[key]
+        return entry
+
+    # ------------------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------------------
+    def get(self, path):
+        """{size, mtime} for an exact path, or None."""
+        self.load()
+        rel_path = self.rel(path)
+        with self.lock:
+            return self.files.get(rel_path) if rel_path is not None else None
+
+    def exists(self, path):
+        return self.get(path) is not None
+
+    def name_taken(self, path):
+        """True if any file differing only in case holds this name (Windows sees them as one)."""
+        self.load()
+        rel_path = self.rel(path)
+        with self.lock:
+            return rel_path is not None and rel_path.casefold() in self.folded
+
+    def names_in(self, directory):
+        """Case-folded names of the logo files directly inside `directory` (a copy)."""
+        self.load()
+        rel_dir = self.rel(directory)
+        rel_dir = "" if rel_dir in (None, ".") else rel_dir
+        with self.lock:
+            return {p.rpartition("/")[2].casefold() for p in self.folders.get(rel_dir, ())}
+
+    def by_stem(self, name):
+        """Relative paths whose normalized stem matches `name`'s, sorted."""
+        self.load()
+        with self.lock:
+            return sorted(self.stems.get(stem_key(name), ()))
+
+    def in_folder(self, folder):
+        """Relative paths directly inside a folder such as 'Soccer/USA MLS', sorted."""
+        self.load()
+        with self.lock:
+            return sorted(self.folders.get(Path(folder).as_posix().strip("/"), ()))
+
+    def folder_names(self):
+        """Relative paths of every folder directly holding a file, sorted."""
+        self.load()
+        with self.lock:
+            return sorted(f for f in self.folders if f)
+
+    def in_sport(self, sport_dir):
+        """Relative paths anywhere under a sport folder such as 'Soccer', sorted."""
+        self.load()
+        with self.lock:
+            return sorted(self.sports.get(sport_dir, ()))
+
+    def all_files(self):
+        """Every relative path, sorted. Cached until the next change and shared, so callers must not modify it."""
+        self.load()
+        with self.lock:
+            version, listing = self._sorted
+            if version != self.version:
+                listing = sorted(self.files)
+                self._sorted = (self.version, listing)
+            return listing
+
+    def entries_under(self, subdir):
+        """[(absolute Path, size, mtime)] for every file under `subdir`."""
+        self.load()
+        rel_dir = self.rel(subdir)
+        prefix = "" if rel_dir in (None, ".", "") else rel_dir.strip("/") + "/"
+        with self.lock:
+            return [(self.root / p, e["size"], e["mtime"]) for p, e in self.files.items() if p.startswith(prefix)]
+
+    # ------------------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------------------
+    def add(self, path):
+        """Records a new or rewritten file (one stat). Paths outside the root or non-logo names are ignored."""
+        rel_path = self.rel(path)
+        if rel_path is None or not is_logo_file(Path(rel_path).name):
+            return
+        try:
+            stat = os.stat(self.root / rel_path)
+        except OSError:
+            return
+        self.load()
+        with self.lock:
+            self._discard(rel_path)
+            self._insert(rel_path, stat.st_size, stat.st_mtime)
+            self.version += 1
+
+    def remove(self, path):
+        rel_path = self.rel(path)
+        if rel_path is None:
+            return
+        self.load()
+        with self.lock:
+            if self._discard(rel_path) is not None:
+                self.version += 1
+
+    def rename(self, old_path, new_path):
+        """Moves an entry after os.rename(); the content is unchanged, so no stat is needed."""
+        old_rel, new_rel = self.rel(old_path), self.rel(new_path)
+        self.load()
+        with self.lock:
+            entry = self._discard(old_rel) if old_rel is not None else None
+            if new_rel is not None and is_logo_file(Path(new_rel).name):
+                if entry is None:
+                    # Arriving from outside the index (e.g. a temp name): pick it up from disk
+                    self.add(new_path)
+                    return
+                self._discard(new_rel)
+                self._insert(new_rel, entry["size"], entry["mtime"])
+            self.version += 1
+
+
+INDEX = LogoIndex()
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Query the in-memory Logos index.")
+    parser.add_argument("command", choices=["stats", "find", "folder"])
+    parser.add_argument("query", nargs="?", default="", help="Name for 'find', folder under Logos/ for 'folder'.")
+    args = parser.parse_args()
+
+    INDEX.load()
+    if args.command == "stats":
+        print(f"{len(INDEX.files)} files in {len(INDEX.folders)} folders.")
+        for sport, paths in sorted(INDEX.sports.items()):
+            print(f"  {sport or '(root)':<24} {len(paths)}")
+    elif args.command == "find":
+        for rel_path in INDEX.by_stem(args.query):
+            print(rel_path)
+    elif args.command == "folder":
+        for rel_path in INDEX.in_folder(args.query):
+            print(rel_path)
+
+if __name__ == "__main__":
+    main()
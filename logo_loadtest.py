@@ -0,0 +1,105 @@
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import quote
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from logo_index import INDEX
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8808
+DEFAULT_CONNECTIONS = 16
+DEFAULT_DURATION = 10.0
+# Requests follow a skewed popularity curve: a few logos are asked for far more often than the rest
+HOT_SET_FRACTION = 0.1
+HOT_SET_SHARE = 0.9
+
+# ==================================================================================
+# LOAD GENERATION
+# ==================================================================================
+def pick_paths(count):
+    paths = list(INDEX.all_files())  # all_files() is the index's shared cached list
+    random.shuffle(paths)
+    return ["/logo/" + quote(p) for p in paths[:count or len(paths)]]
+
+
+def worker(host, port, paths, deadline, revalidate):
+    """One keep-alive connection issuing requests until `deadline`. Returns ([latencies], Counter of statuses)."""
+    hot = paths[:max(1, int(len(paths) * HOT_SET_FRACTION))]
+    etags = {}
+    latencies = []
+    statuses = Counter()
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    while time.perf_counter() < deadline:
+        path = random.choice(hot if random.random() < HOT_SET_SHARE else paths)
+        headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            statuses["error"] += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] += 1
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    conn.close()
+    return latencies, statuses
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def run(host, port, connections, duration, paths, revalidate=False):
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        futures = [executor.submit(worker, host, port, paths, deadline, revalidate) for _ in range(connections)]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(l for lats, _ in results for l in lats)
+    statuses = sum((s for _, s in results), Counter())
+    print(f"{len(latencies)} requests in {elapsed:.1f}s over {connections} connections "
+          f"-> {len(latencies) / elapsed:,.0f} req/s")
+    print(f"Latency ms: p50 {percentile(latencies, 50) * 1000:.2f}  p90 {percentile(latencies, 90) * 1000:.2f}  "
+          f"p99 {percentile(latencies, 99) * 1000:.2f}  max {(latencies[-1] if latencies else 0) * 1000:.2f}")
+    print("Statuses: " + ", ".join(f"{k}={v}" for k, v in sorted(statuses.items(), key=str)))
+    return latencies, statuses
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Measure requests/sec and latency percentiles of logo_server.py.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS, help="Concurrent keep-alive clients.")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Seconds to run.")
+    parser.add_argument("--files", type=int, default=0, help="Number of distinct logos to request (default: all).")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="Send If-None-Match for logos already fetched (measures the 304 path).")
+    args = parser.parse_args()
+
+    paths = pick_paths(args.files)
+    if not paths:
+        print("No logos found under Logos/.")
+        return
+    print(f"Requesting {len(paths)} logos from http://{args.host}:{args.port}/ for {args.duration:.0f}s...")
+    run(args.host, args.port, args.connections, args.duration, paths, args.revalidate)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import os
+import time
+import shutil
+import argparse
+import mimetypes
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from urllib.parse import urlsplit, unquote, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from logo_index import INDEX
+from manifest import MANIFEST
+from derivative_cache import CACHE as DERIVATIVES
+from resolution_index import ResolutionIndex, INDEX_FILE, normalize_key, collect, encode, read_rows
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+LOGOS_DIR = BASE_DIR / "Logos"
+STANDARDIZED_DIR = BASE_DIR / "Standardized"
+
+HOST = os.environ.get("LOGO_SERVER_HOST", "127.0.0.1")
+PORT = int(os.environ.get("LOGO_SERVER_PORT", "8808"))
+MEMORY_BYTES = int(os.environ.get("LOGO_SERVER_MEMORY_BYTES", str(64 * 1024 * 1024)))
+MAX_CACHED_FILE = 1024 * 1024  # bigger files always go out via sendfile
+REVALIDATE_SECONDS = 2.0        # how often a rebuilt resolution_index.bin is looked for
+
+# Direct file URLs never change meaning; entity URLs can be re-pointed by a rename, so they are revalidated sooner
+FILE_CACHE_CONTROL = "public, max-age=86400"
+ENTITY_CACHE_CONTROL = "public, max-age=300"
+
+# ==================================================================================
+# IN-MEMORY LRU
+# ==================================================================================
+class ByteLRU:
+    """Path -> entry dict, least recently used dropped first once the bytes held pass `max_bytes`."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total = 0
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        size = len(entry['data'])
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.total -= len(old['data'])
+            self.entries[key] = entry
+            self.total += size
+            while self.total > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total -= len(evicted['data'])
+
+    def discard(self, key):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.total -= len(old['data'])
+
+# ==================================================================================
+# HANDLER
+# ==================================================================================
+def parse_etags(header):
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+def under_logos(rel_path):
+    """True if `rel_path` stays inside Logos/ once '..' and symlinks are resolved."""
+    return (LOGOS_DIR / rel_path).resolve().is_relative_to(LOGOS_DIR.resolve())
+
+
+def current_digest(path):
+    """
+    sha256 of a logo as it is on disk now. Costs one stat: when the size or mtime differ from
+    what the index holds (another process rewrote, replaced or renamed the file), the entry
+    is refreshed so the manifest re-hashes instead of returning the old digest. Raises
+    FileNotFoundError, and forgets the entry, once the file is gone.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        INDEX.remove(path)
+        raise
+    known = INDEX.get(path)
+    if known is None or (known['size'], known['mtime']) != (stat.st_size, stat.st_mtime):
+        INDEX.add(path)
+    return MANIFEST.digest(path)
+
+
+class LogoHandler(BaseHTTPRequestHandler):
+    """
+    GET /logo/<path under Logos/>[?w=&h=&format=]
+    GET /entity/<SPORT_ID>[/<LEAGUE_ID>[/<NAME>]][?...], /entity/<PREFERRED_FILE_PATH> or /entity/id:<SGO id>
+    Entities without a logo of their own get their league's (or sport's), named in X-Logo-Source.
+    """
+    protocol_version = "HTTP/1.1"
+    server_version = "ImageCache/1.0"
+    # Headers and body go out in separate writes; with Nagle on, each response waits out a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        segments = [unquote(s) for s in parts.path.strip("/").split("/") if s]
+        extra_headers = {}
+
+        if len(segments) >= 2 and segments[0] == "logo":
+            rel_path, cache_control = "/".join(segments[1:]), FILE_CACHE_CONTROL
+            # Segments are unquoted after splitting, so an encoded %2F or backslash must not
+            # smuggle in a path of its own; only files the index knows are ever served
+            if any("/" in s or "\\" in s or s in (".", "..") for s in segments) \
+                    or not under_logos(rel_path) or not INDEX.exists(rel_path):
+                return self.send_error(404, "No such logo")
+        elif len(segments) >= 2 and segments[0] == "entity":
+            found = self.server.current_resolver().lookup(normalize_key("/".join(segments[1:])))
+            if found is None:
+                return self.send_error(404, "Unknown entity")
+            rel_path, level = found
+            if rel_path is None:
+                return self.send_error(404, "Known to have no logo")
+            cache_control = ENTITY_CACHE_CONTROL
+            extra_headers["X-Logo-Source"] = level
+        else:
+            return self.send_error(404, "Use /logo/<path> or /entity/<sport>/<league>/<team>")
+
+        try:
+            path, etag = self.pick_file(rel_path, query)
+        except ValueError as e:
+            return self.send_error(400, str(e))
+        except OSError:
+            return self.send_error(404, "No logo for that key")
+
+        if etag in parse_etags(self.headers.get("If-None-Match", "")) or "*" in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", cache_control)
+            self.send_header("Content-Length", "0")
+            for name, value in extra_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        # The ETag was just computed from a fresh stat; a held copy is only good if it was read under the same one
+        entry = self.server.memory.get(str(path))
+        if entry and entry['etag'] != etag:
+            self.server.memory.discard(str(path))
+            entry = None
+
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if entry:
+            self.send_headers(200, etag, cache_control, content_type, len(entry['data']), extra_headers)
+            if send_body:
+                self.wfile.write(entry['data'])
+            return
+
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.send_headers(200, etag, cache_control, content_type, stat.st_size, extra_headers)
+            if send_body:
+                self.send_file(f, stat.st_size)
+            if stat.st_size <= MAX_CACHED_FILE and self.server.admit(str(path)):
+                f.seek(0)
+                data = f.read()
+                # Don't hold bytes that changed after the ETag was taken; the next request re-reads them
+                if len(data) == stat.st_size and etag == self.pick_file(rel_path, query)[1]:
+                    self.server.memory.put(str(path), {"data": data, "etag": etag})
+
+    def pick_file(self, rel_path, query):
+        """(absolute path, strong ETag) for the original, a standardized copy, or a resized variant."""
+        if not under_logos(rel_path):
+            raise FileNotFoundError(rel_path)
+        source = LOGOS_DIR / rel_path
+        digest = current_digest(source)
+        if "w" in query:
+            width = int(query["w"][0])
+            height = int(query.get("h", [width])[0])
+            variant = DERIVATIVES.get(source, width, height, query.get("format", ["png"])[0])
+            return variant, f'"{variant.name}"'
+        if self.server.standardized:
+            standardized = STANDARDIZED_DIR / str(self.server.standardized) / Path(rel_path).with_suffix(".png")
+            if standardized.exists():
+                return standardized, f'"{digest}-s{self.server.standardized}"'
+        return source, f'"{digest}"'
+
+    def send_headers(self, status, etag, cache_control, content_type, length, extra_headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def send_file(self, f, size):
+        """Zero-copy from the page cache to the socket where the OS supports it."""
+        if not hasattr(os, "sendfile"):
+            shutil.copyfileobj(f, self.wfile)
+            return
+        self.wfile.flush()
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(self.connection.fileno(), f.fileno(), offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+
+
+def load_resolver():
+    """The built resolution_index.bin, or one compiled in memory from logo.csv and Logos/ if it hasn't been built."""
+    if INDEX_FILE.exists():
+        return ResolutionIndex.open(INDEX_FILE)
+    print(f"  {INDEX_FILE.name} not found; resolving entities from logo.csv only (run resolution_index.py build).")
+    return ResolutionIndex(encode(collect(read_rows())))
+
+
+class LogoServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, memory_bytes=MEMORY_BYTES, standardized=None, verbose=False):
+        super().__init__(address, LogoHandler)
+        self.memory = ByteLRU(memory_bytes)
+        self.resolver = load_resolver()
+        self.resolver_mtime = self.index_mtime()
+        self.resolver_checked = time.monotonic()
+        self.standardized = standardized
+        self.verbose = verbose
+        # A file is copied into memory on its second request, so one-off reads don't churn the LRU
+        self.recent_misses = OrderedDict()
+        self.admit_lock = threading.Lock()
+
+    @staticmethod
+    def index_mtime():
+        try:
+            return INDEX_FILE.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def current_resolver(self):
+        """The resolver, reopened when resolution_index.py build has replaced the file since it was loaded."""
+        now = time.monotonic()
+        if now - self.resolver_checked > REVALIDATE_SECONDS:
+            self.resolver_checked = now
+            mtime = self.index_mtime()
+            if mtime != self.resolver_mtime:
+                self.resolver, self.resolver_mtime = load_resolver(), mtime
+        return self.resolver
+
+    def admit(self, key):
+        with self.admit_lock:
+            if key in self.recent_misses:
+                del self.recent_misses[key]
+                return True
+            self.recent_misses[key] = None
+            if len(self.recent_misses) > 10000:
+                self.recent_misses.popitem(last=False)
+            return False
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Serve logos over HTTP with an in-memory LRU and ETags.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--memory-mb", type=float, default=MEMORY_BYTES / 1024 / 1024)
+    parser.add_argument("--standardized", type=int, metavar="SIZE",
+                        help="Serve Standardized/<SIZE>/ copies (see standardize.py) when they exist.")
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args()
+
+    INDEX.load()
+    server = LogoServer((args.host, args.port), int(args.memory_mb * 1024 * 1024), args.standardized, args.verbose)
+    print(f"Serving {len(INDEX.files)} logos on http://{args.host}:{args.port}/ "
+          f"({server.resolver.n_entries} entity keys, {args.memory_mb:.0f} MiB memory cache).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        MANIFEST.save()
+        DERIVATIVES.save()
+        memory = server.memory
+        print(f"\nMemory cache: {memory.hits} hits, {memory.misses} misses, {memory.total / 1024:.0f} KiB held.")
+
+if __name__ == "__main__":
+    main()
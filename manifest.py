@@ -0,0 +1,232 @@
+import os
+import json
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+
+from logo_index import INDEX
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+LOGOS_DIR = BASE_DIR / "Logos"
+MANIFEST_FILE = BASE_DIR / "file_manifest.json"
+
+
+def hash_file(path, chunk_size=1 << 16):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+# ==================================================================================
+# MANIFEST
+# ==================================================================================
+class FileManifest:
+    """
+    Relative path -> {size, mtime, sha256, catalog, decision} for every file under Logos/.
+
+    A file is re-hashed only when its size or mtime changes, and re-matched only when
+    it changed, has no recorded decision, or the catalog it was matched against changed.
+    """
+
+    def __init__(self, path=MANIFEST_FILE, root=LOGOS_DIR, index=INDEX):
+        self.path = Path(path)
+        self.root = Path(root)
+        self.index = index
+        self.files = None
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.version = 0             # bumped whenever a path or hash changes
+        self._by_hash = (-1, {})     # (version, sha256 -> [relative path]) built on demand
+
+    def load(self):
+        with self.lock:
+            if self.files is not None:
+                return self
+            self.files = {}
+            if self.path.exists():
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self.files = json.load(f).get('files', {})
+                except Exception as e:
+                    print(f"  [manifest] Could not read {self.path.name} ({e}), rebuilding.")
+        return self
+
+    def rel(self, path):
+        return Path(path).relative_to(self.root).as_posix()
+
+    def scan(self, subdir):
+        """
+        Refreshes every entry under `subdir` and drops entries whose file is gone.
+        Returns [(Path, changed)] where changed means new or modified since the last scan.
+        Sizes and mtimes come from the shared LogoIndex, so only changed files touch the disk.
+        """
+        self.load()
+        subdir = Path(subdir)
+        prefix = "" if subdir == self.root else self.rel(subdir) + "/"
+        results = []
+        seen = set()
+
+        for path, size, mtime in self.index.entries_under(subdir):
+            rel_path = self.rel(path)
+            seen.add(rel_path)
+            with self.lock:
+                known = self.files.get(rel_path)
+            if known and known.get('size') == size and known.get('mtime') == mtime:
+                results.append((path, False))
+                continue
+
+            digest = hash_file(path)
+            with self.lock:
+                record = {"size": size, "mtime": mtime, "sha256": digest}
+                # Same bytes (e.g. only touched): keep the previous decision
+                if known and known.get('sha256') == digest:
+                    for field in ("catalog", "decision"):
+                        if field in known:
+                            record[field] = known[field]
+                self.files[rel_path] = record
+                self.version += 1
+                self.dirty = True
+            results.append((path, not (known and known.get('sha256') == digest)))
+
+        with self.lock:
+            for rel_path in [r for r in self.files if r.startswith(prefix) and r not in seen]:
+                del self.files[rel_path]
+                self.version += 1
+                self.dirty = True
+        return results
+
+    def digest(self, path):
+        """
+        sha256 of one file, re-hashed only if its size/mtime moved since it was recorded.
+        Renames carry their entry over (record_rename), so a renamed file is never re-read.
+        """
+        self.load()
+        rel_path = self.rel(path)
+        stat = self.index.get(path)
+        if stat is None:
+            st = os.stat(path)
+            stat = {"size": st.st_size, "mtime": st.st_mtime}
+        with self.lock:
+            known = self.files.get(rel_path)
+        if known and known.get('size') == stat['size'] and known.get('mtime') == stat['mtime'] and known.get('sha256'):
+            return known['sha256']
+        digest = hash_file(path)
+        with self.lock:
+            record = {"size": stat['size'], "mtime": stat['mtime'], "sha256": digest}
+            if known and known.get('sha256') == digest:
+                for field in ("catalog", "decision"):
+                    if field in known:
+                        record[field] = known[field]
+            self.files[rel_path] = record
+            self.version += 1
+            self.dirty = True
+        return digest
+
+    def holders(self, digest):
+        """
+        Relative paths whose recorded sha256 is `digest` and whose size/mtime in the shared
+        LogoIndex still match the record, sorted. Renames carry their entry over, so a file
+        keeps being found here after Normalize gives it a new name.
+        """
+        self.load()
+        with self.lock:
+            version, table = self._by_hash
+            if version != self.version:
+                table = {}
+                for rel_path, entry in self.files.items():
+                    if entry.get('sha256'):
+                        table.setdefault(entry['sha256'], []).append(rel_path)
+                self._by_hash = (self.version, table)
+            candidates = [(p, self.files[p]) for p in table.get(digest, ())]
+        current = []
+        for rel_path, entry in candidates:
+            stat = self.index.get(rel_path)
+            if stat and (stat['size'], stat['mtime']) == (entry.get('size'), entry.get('mtime')):
+                current.append(rel_path)
+        return sorted(current)
+
+    def needs_match(self, path, catalog_fp):
+        with self.lock:
+            entry = self.files.get(self.rel(path))
+        return not entry or 'decision' not in entry or entry.get('catalog') != catalog_fp
+
+    def decision(self, path):
+        with self.lock:
+            entry = self.files.get(self.rel(path)) or {}
+        return entry.get('decision')
+
+    def record_decision(self, path, catalog_fp, decision):
+        with self.lock:
+            entry = self.files.get(self.rel(path))
+            if entry is None:
+                return
+            entry['catalog'] = catalog_fp
+            entry['decision'] = decision
+            self.dirty = True
+
+    def record_rename(self, old_path, new_path, catalog_fp, decision):
+        """Moves an entry to its new path after a rename (content is unchanged, so no re-hash)."""
+        new_path = Path(new_path)
+        with self.lock:
+            entry = self.files.pop(self.rel(old_path), None)
+            if entry is None:
+                return
+            entry['mtime'] = (self.index.get(new_path) or entry)['mtime']
+            entry['catalog'] = catalog_fp
+            entry['decision'] = decision
+            self.files[self.rel(new_path)] = entry
+            self.version += 1
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"files": self.files}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+
+MANIFEST = FileManifest()
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the Logos file manifest.")
+    parser.add_argument("command", choices=["scan", "stats", "forget"])
+    parser.add_argument("subdir", nargs="?", default="", help="Folder under Logos/ (default: everything).")
+    args = parser.parse_args()
+
+    MANIFEST.load()
+    if args.command == "scan":
+        results = MANIFEST.scan(LOGOS_DIR / args.subdir)
+        MANIFEST.save()
+        print(f"{len(results)} files, {sum(1 for _, changed in results if changed)} new or changed.")
+    elif args.command == "stats":
+        decisions = {}
+        for entry in MANIFEST.files.values():
+            status = (entry.get('decision') or {}).get('status', 'undecided')
+            decisions[status] = decisions.get(status, 0) + 1
+        print(f"{len(MANIFEST.files)} files tracked.")
+        for status, count in sorted(decisions.items()):
+            print(f"  {status:<16} {count}")
+    elif args.command == "forget":
+        # Drop decisions so the next Normalize run re-matches these files
+        prefix = args.subdir.strip("/")
+        for rel_path, entry in MANIFEST.files.items():
+            if rel_path.startswith(prefix):
+                entry.pop('decision', None)
+                MANIFEST.dirty = True
+        MANIFEST.save()
+        print("Decisions cleared.")
+
+if __name__ == "__main__":
+    main()
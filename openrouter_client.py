@@ -0,0 +1,147 @@
+import time
+import random
+import threading
+import requests
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+# ==================================================================================
+# RATE LIMITING
+# ==================================================================================
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every request to the same API.
+
+    `rate` tokens are added per second up to `capacity`. A 429 with Retry-After
+    calls pause(), which holds back *all* callers, not just the one that was throttled,
+    and halves the rate. Each success then wins back a tenth of the configured rate.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=None):
+        self.max_rate = float(rate)
+        self.min_rate = float(min_rate if min_rate is not None else rate / 8)
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stops handing out tokens for `seconds` (server asked us to back off)."""
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0
+            self.updated = now
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def recover(self):
+        """Creeps the rate back toward its ceiling after a request went through."""
+        with self.lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+def parse_retry_after(value):
+    """Retry-After is either delta-seconds or an HTTP-date. Returns seconds or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+# ==================================================================================
+# REQUESTS
+# ==================================================================================
+class RequestTimeout(Exception):
+    """Raised when a request could not complete within its overall deadline."""
+
+
+def post_chat(payload, headers, limiter=None, timeout=60, retries=4, backoff=1.0):
+    """
+    POSTs a chat completion and returns the parsed JSON response.
+
+    - Every attempt takes a token from `limiter` first.
+    - 429 honours Retry-After (pausing the shared limiter); 5xx and connection
+      errors back off exponentially with jitter.
+    - `timeout` is a deadline for the whole call, retries included.
+    """
+    deadline = time.monotonic() + timeout
+    last_error = None
+
+    for attempt in range(retries + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if limiter:
+            limiter.acquire()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+        delay = backoff * (2 ** attempt) + random.uniform(0, backoff)
+        try:
+            resp = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=remaining)
+            if resp.status_code == 429:
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else delay
+                if limiter:
+                    limiter.pause(delay)
+                last_error = requests.HTTPError(f"429 Too Many Requests (retry after {delay:.1f}s)", response=resp)
+            elif resp.status_code >= 500:
+                last_error = requests.HTTPError(f"{resp.status_code} Server Error", response=resp)
+            else:
+                resp.raise_for_status()
+                if limiter:
+                    limiter.recover()
+                return resp.json()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            last_error = e
+
+        if attempt < retries:
+            if time.monotonic() + delay >= deadline:
+                break
+            time.sleep(delay)
+
+    raise RequestTimeout(f"Request failed after retries/deadline: {last_error}")
+
+
+def dispatch(jobs, fn, max_in_flight=4):
+    """
+    Runs fn(job) for every job with at most `max_in_flight` running at once.
+    Returns results in the same order as `jobs`, so callers can zip them back.
+    """
+    jobs = list(jobs)
+    if max_in_flight <= 1 or len(jobs) <= 1:
+        return [fn(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(jobs))) as executor:
+        return list(executor.map(fn, jobs))
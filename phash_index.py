@@ -0,0 +1,266 @@
+import os
+import json
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from logo_index import INDEX
+from manifest import MANIFEST
+from standardize import to_rgba
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+LOGOS_DIR = BASE_DIR / "Logos"
+PHASH_FILE = BASE_DIR / "phash_index.json"
+
+# 16x16 = 256-bit hashes: at 8x8, round crests on white (e.g. nets.gif and jets.gif) collide
+HASH_SIZE = 16
+# Hamming distance (out of 256 bits) at or under which two logos count as the same picture
+DEFAULT_RADIUS = int(os.environ.get("PHASH_RADIUS", "10"))
+WORKERS = int(os.environ.get("PHASH_WORKERS", "0")) or os.cpu_count() or 1
+
+# ==================================================================================
+# HASHING
+# ==================================================================================
+def dhash(path, size=HASH_SIZE):
+    """
+    Difference hash: flatten transparency onto white, shrink to (size+1) x size grey,
+    one bit per horizontal neighbour comparison. Survives resizing, re-encoding
+    and GIF/PNG conversion; a different logo lands far away.
+    """
+    with Image.open(path) as img:
+        rgba = to_rgba(img)
+    flat = Image.new("RGB", rgba.size, (255, 255, 255))
+    flat.paste(rgba, mask=rgba.getchannel("A"))
+    pixels = flat.convert("L").resize((size + 1, size), Image.LANCZOS).tobytes()
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def _hash_job(job):
+    digest, path = job
+    try:
+        return digest, dhash(path), None
+    except Exception as e:
+        return digest, None, str(e)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+# ==================================================================================
+# BK-TREE
+# ==================================================================================
+class BKTree:
+    """
+    Metric tree over Hamming distance. A radius-r query only descends into children
+    whose edge distance lies in [d - r, d + r], so it touches a small part of the tree.
+    """
+
+    def __init__(self):
+        self.root = None # [hash, [items], {distance: child node}]
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, radius):
+        """[(distance, item)] for everything within `radius`, nearest first."""
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                results.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return sorted(results)
+
+# ==================================================================================
+# INDEX
+# ==================================================================================
+class PerceptualIndex:
+    """
+    Content hash -> 256-bit dHash for every image under Logos/, persisted in phash_index.json.
+
+    Hashes are keyed by the file's sha256 (from the file manifest), so renamed or
+    copied files are never decoded twice. The BK-tree is rebuilt from the stored
+    hashes in memory and maps each hash to the current relative paths.
+    """
+
+    def __init__(self, path=PHASH_FILE):
+        self.path = Path(path)
+        self.hashes = None
+        self.tree = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.hashes is not None:
+                return self
+            self.hashes = {}
+            if self.path.exists():
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self.hashes = {k: int(v, 16) for k, v in json.load(f).get('hashes', {}).items()}
+                except Exception as e:
+                    print(f"  [phash] Could not read {self.path.name} ({e}), rebuilding.")
+        return self
+
+    def update(self, workers=WORKERS):
+        """Hashes every file whose content hasn't been seen before (in parallel) and rebuilds the tree."""
+        self.load()
+        pending = {}
+        for rel_path in INDEX.all_files():
+            digest = MANIFEST.digest(LOGOS_DIR / rel_path)
+            if digest not in self.hashes and digest not in pending:
+                pending[digest] = str(LOGOS_DIR / rel_path)
+        MANIFEST.save()
+
+        failed = []
+        if pending:
+            print(f"Hashing {len(pending)} new images with {workers} workers...")
+            with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+                for digest, value, error in executor.map(_hash_job, pending.items(), chunksize=16):
+                    if error:
+                        failed.append((pending[digest], error))
+                    else:
+                        with self.lock:
+                            self.hashes[digest] = value
+                            self.dirty = True
+        self.build_tree()
+        return len(pending) - len(failed), failed
+
+    def build_tree(self):
+        tree = BKTree()
+        for rel_path in INDEX.all_files():
+            value = self.hashes.get(MANIFEST.digest(LOGOS_DIR / rel_path))
+            if value is not None:
+                tree.add(value, rel_path)
+        self.tree = tree
+        return tree
+
+    def _ensure_tree(self):
+        self.load()
+        with self.lock:
+            if self.tree is None:
+                self.build_tree()
+        return self.tree
+
+    def check(self, path, radius=DEFAULT_RADIUS):
+        """[(distance, relative path)] of logos that look like the image at `path` (which need not be in Logos/)."""
+        tree = self._ensure_tree()
+        value = dhash(path)
+        with self.lock:
+            return tree.search(value, radius)
+
+    def add(self, path, digest):
+        """Indexes a file just written to Logos/ so later checks in the same run see it."""
+        tree = self._ensure_tree()
+        value = dhash(path)
+        with self.lock:
+            self.hashes[digest] = value
+            self.dirty = True
+            tree.add(value, INDEX.rel(path))
+
+    def clusters(self, radius=DEFAULT_RADIUS):
+        """Groups of relative paths within `radius` of each other (transitively), largest first."""
+        self._ensure_tree()
+        parent = {}
+
+        def find(x):
+            while parent.setdefault(x, x) != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for rel_path in INDEX.all_files():
+            value = self.hashes.get(MANIFEST.digest(LOGOS_DIR / rel_path))
+            if value is None:
+                continue
+            for _, other in self.tree.search(value, radius):
+                parent[find(other)] = find(rel_path)
+
+        groups = {}
+        for rel_path in parent:
+            groups.setdefault(find(rel_path), []).append(rel_path)
+        return sorted((sorted(g) for g in groups.values() if len(g) > 1), key=lambda g: (-len(g), g[0]))
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"hashes": {k: f"{v:0{HASH_SIZE * HASH_SIZE // 4}x}" for k, v in self.hashes.items()}}, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+
+PHASHES = PerceptualIndex()
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate and near-duplicate logos by perceptual hash.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_p = sub.add_parser("build", help="Hash new or changed images.")
+    build_p.add_argument("--workers", type=int, default=WORKERS)
+    dupes_p = sub.add_parser("dupes", help="List clusters of duplicate / near-duplicate logos.")
+    dupes_p.add_argument("--radius", type=int, default=DEFAULT_RADIUS, help="Max differing bits (0 = identical picture).")
+    check_p = sub.add_parser("check", help="Check an image (e.g. a fresh download) against the collection.")
+    check_p.add_argument("image")
+    check_p.add_argument("--radius", type=int, default=DEFAULT_RADIUS)
+    args = parser.parse_args()
+
+    hashed, failed = PHASHES.update(getattr(args, "workers", WORKERS))
+    PHASHES.save()
+    for path, error in failed:
+        print(f"  [ERR] {Path(path).name}: {error}")
+
+    if args.command == "build":
+        print(f"{hashed} images hashed, {PHASHES.tree.size} files indexed.")
+    elif args.command == "dupes":
+        groups = PHASHES.clusters(args.radius)
+        for group in groups:
+            print(f"{len(group)} copies:")
+            for rel_path in group:
+                print(f"  {rel_path}")
+        print(f"\n{len(groups)} clusters, {sum(len(g) - 1 for g in groups)} redundant files.")
+    elif args.command == "check":
+        matches = PHASHES.check(args.image, args.radius)
+        if not matches:
+            print("No similar logo in the collection.")
+        for distance, rel_path in matches:
+            print(f"  {distance:>2} bits  {rel_path}")
+
+if __name__ == "__main__":
+    main()
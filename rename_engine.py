@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import uuid
+import argparse
+from pathlib import Path
+
+import rename_history
+from logo_index import INDEX
+from blob_store import BLOBS
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+JOURNAL_FILE = BASE_DIR / "rename_journal.jsonl"
+
+# ==================================================================================
+# PLANNING
+# ==================================================================================
+def name_key(name):
+    """Collision key. Case-insensitive because the tree is also worked on from Windows."""
+    return name.casefold()
+
+
+def plan_renames(requests):
+    """
+    Plans a batch of renames entirely in memory.
+
+    `requests` is a list of (old_path, new_stem). Returns (moves, steps):
+      moves - one {"index", "src", "dst"} per request that actually changes a name
+      steps - the ordered list of {"src", "dst"} disk operations that realise them
+
+    Listings of folders under Logos/ come from the shared LogoIndex; anything else is
+    listed once per directory. Collisions get the usual `_1`, `_2` suffixes from
+    a per-name counter instead of probing the disk. Chains (A->B while B->C) are
+    ordered so B moves first. Cycles (A->B, B->A) go through a temporary name.
+    """
+    listings = {}
+    moving = {}
+
+    def keeps_name(old_path, new_stem):
+        return f"{new_stem}{Path(old_path).suffix}" == Path(old_path).name
+
+    def listing(directory):
+        if directory not in listings:
+            if INDEX.rel(directory) is not None and Path(directory).is_absolute():
+                listings[directory] = INDEX.names_in(directory)
+            else:
+                try:
+                    listings[directory] = {name_key(n) for n in os.listdir(directory)}
+                except FileNotFoundError:
+                    listings[directory] = set()
+        return listings[directory]
+
+    for old_path, new_stem in requests:
+        # A file that keeps its name never leaves; counting it as leaving would let an
+        # earlier request claim the name and land on it
+        if keeps_name(old_path, new_stem):
+            continue
+        old_path = Path(old_path)
+        moving.setdefault(old_path.parent, set()).add(name_key(old_path.name))
+
+    # Names that will be taken once the batch is done: everything that isn't moving away
+    claimed = {}
+    for directory, leaving in moving.items():
+        claimed[directory] = listing(directory) - leaving
+    counters = {}
+
+    moves = []
+    for index, (old_path, new_stem) in enumerate(requests):
+        if keeps_name(old_path, new_stem):
+            continue
+        old_path = Path(old_path)
+        directory = old_path.parent
+        suffix = old_path.suffix
+        taken = claimed[directory]
+
+        new_name = f"{new_stem}{suffix}"
+        if name_key(new_name) in taken:
+            counter_key = (directory, name_key(new_stem), name_key(suffix))
+            counter = counters.get(counter_key, 1)
+            while name_key(f"{new_stem}_{counter}{suffix}") in taken:
+                counter += 1
+            counters[counter_key] = counter + 1
+            new_name = f"{new_stem}_{counter}{suffix}"
+
+        taken.add(name_key(new_name))
+        moves.append({"index": index, "src": str(old_path), "dst": str(directory / new_name)})
+
+    return moves, order_steps(moves)
+
+
+def order_steps(moves):
+    """Orders moves so no step lands on a name that another pending step has yet to vacate."""
+    pending = {m["src"]: m["dst"] for m in moves}
+    # Keyed by the collision key so a case-only chain is still seen as one
+    pending_keys = {(str(Path(src).parent), name_key(Path(src).name)): src for src in pending}
+    steps = []
+    tmp_counter = 0
+
+    def blocked(src, dst):
+        other = pending_keys.get((str(Path(dst).parent), name_key(Path(dst).name)))
+        return other is not None and other != src
+
+    while pending:
+        progressed = False
+        for src in list(pending):
+            dst = pending[src]
+            if not blocked(src, dst):
+                steps.append({"src": src, "dst": dst})
+                del pending[src]
+                del pending_keys[(str(Path(src).parent), name_key(Path(src).name))]
+                progressed = True
+        if not progressed:
+            # Every remaining step waits on another: a cycle. Park one source on a temp name.
+            src = next(iter(pending))
+            dst = pending.pop(src)
+            del pending_keys[(str(Path(src).parent), name_key(Path(src).name))]
+            tmp = str(Path(src).parent / f".rename-{uuid.uuid4().hex[:8]}-{tmp_counter}.tmp")
+            tmp_counter += 1
+            steps.append({"src": src, "dst": tmp})
+            pending[tmp] = dst
+            pending_keys[(str(Path(tmp).parent), name_key(Path(tmp).name))] = tmp
+    return steps
+
+# ==================================================================================
+# JOURNAL
+# ==================================================================================
+def _append(f, record, sync=False):
+    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    f.flush()
+    if sync:
+        os.fsync(f.fileno())
+
+
+def read_journal(journal_path=JOURNAL_FILE):
+    """Returns (header, done_step_indexes, committed) or None when there is no journal."""
+    journal_path = Path(journal_path)
+    if not journal_path.exists():
+        return None
+    header, done, committed = None, set(), False
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # torn final line from a crash
+            if record.get("type") == "begin":
+                header = record
+            elif record.get("type") == "done":
+                done.add(record["step"])
+            elif record.get("type") == "undone":
+                done.discard(record["step"])
+            elif record.get("type") == "commit":
+                committed = True
+    if header is None:
+        return None
+    return header, done, committed
+
+
+def execute(moves, steps, journal_path=JOURNAL_FILE, meta=None, applied=None):
+    """
+    Applies a plan behind a write-ahead journal.
+
+    The full plan is written and fsync'd before the first rename. Each completed step
+    is appended as it lands, and a commit record closes the journal. If the process dies
+    midway, recover() can finish or undo the batch. Returns {move index: error or None}.
+
+    `applied`, if given, receives every (src, dst) step that landed, in the order it ran
+    and including temp-name hops. That is what the rename history must record: undoing
+    those newest first replays the batch backwards, chains and cycles included.
+    """
+    journal_path = Path(journal_path)
+    if journal_path.exists():
+        raise RuntimeError(f"Unfinished rename journal at {journal_path}; run 'python rename_engine.py resume' or 'rollback' first.")
+
+    header = {"type": "begin", "id": uuid.uuid4().hex, "time": time.time(), "meta": meta or {}, "moves": moves, "steps": steps}
+    errors = {}
+    with open(journal_path, 'w', encoding='utf-8') as f:
+        _append(f, header, sync=True)
+        never_arrived = set()  # dst names a failed step was supposed to create
+        still_there = set()    # src names a failed step was supposed to vacate
+        for i, step in enumerate(steps):
+            # A step whose source came from a failed step (temp parking) cannot run either,
+            # and nothing may land on a name that a failed step left occupied
+            if step["src"] in never_arrived or name_key(step["dst"]) in still_there:
+                never_arrived.add(step["dst"])
+                still_there.add(name_key(step["src"]))
+                errors[(step["src"], step["dst"])] = OSError("skipped: depends on a failed rename")
+                continue
+            try:
+                # Planning keeps targets free, but the disk may have changed since; never overwrite.
+                # A case-only rename is the one step whose target may already "exist" (as itself).
+                if os.path.exists(step["dst"]) and name_key(step["dst"]) != name_key(step["src"]):
+                    raise FileExistsError(f"{Path(step['dst']).name} already exists")
+                os.rename(step["src"], step["dst"])
+                INDEX.rename(step["src"], step["dst"])
+                BLOBS.follow_rename(step["src"], step["dst"])
+                # Durable before the next step: recovery trusts these records, not the disk
+                _append(f, {"type": "done", "step": i}, sync=True)
+                if applied is not None:
+                    applied.append((step["src"], step["dst"]))
+            except OSError as e:
+                never_arrived.add(step["dst"])
+                still_there.add(name_key(step["src"]))
+                errors[(step["src"], step["dst"])] = e
+        os.fsync(f.fileno())
+        _append(f, {"type": "commit"}, sync=True)
+
+    # The name layer first: once the journal is gone nothing can replay these renames into it
+    BLOBS.save()
+    # Retire the journal; the batch is durable on disk
+    journal_path.unlink()
+    return _move_errors(moves, steps, errors)
+
+
+def _move_errors(moves, steps, step_errors):
+    """Maps step failures back to the moves they belong to (following temp-name hops)."""
+    failed = {}
+    next_hop = {s["src"]: s["dst"] for s in steps}
+    for move in moves:
+        src = move["src"]
+        error = None
+        while src in next_hop and src != move["dst"]:
+            dst = next_hop[src]
+            if (src, dst) in step_errors:
+                error = step_errors[(src, dst)]
+                break
+            src = dst
+        failed[move["index"]] = error
+    return failed
+
+# ==================================================================================
+# RECOVERY
+# ==================================================================================
+def recover(mode="resume", journal_path=JOURNAL_FILE, history_path=rename_history.HISTORY_FILE):
+    """
+    Finishes (resume) or reverts (rollback) an interrupted batch.
+
+    Every 'done' record is fsync'd before the next step starts, so the journal is exact
+    except for the one step that may have been in flight at the crash. Only that step is
+    judged from the disk. Nothing is ever renamed onto an existing name: in a chain the
+    next hop re-fills a source, so an occupied target means a conflict to report, not a
+    step to redo. Recovery stops at the first conflict; fix it and run it again.
+    """
+    state = read_journal(journal_path)
+    if state is None:
+        print("No rename journal found.")
+        return None
+    header, done, committed = state
+    steps = header["steps"]
+
+    if committed:
+        print("Journal was committed; nothing to do.")
+        Path(journal_path).unlink()
+        return header
+
+    # Steps run in order, so everything before the first missing record landed
+    in_flight = next((i for i in range(len(steps)) if i not in done), len(steps))
+    landed = [i for i in range(len(steps)) if i in done]
+    if in_flight < len(steps):
+        step = steps[in_flight]
+        if not os.path.exists(step["src"]) and os.path.exists(step["dst"]):
+            landed.append(in_flight)
+    landed.sort()
+
+    def move(src, dst):
+        if os.path.exists(dst):
+            raise FileExistsError(f"{Path(dst).name} already exists")
+        os.rename(src, dst)
+
+    if mode not in ("resume", "rollback"):
+        raise ValueError(f"Unknown recovery mode: {mode}")
+
+    # Progress is journaled too, so a recovery that stops on a conflict can be rerun
+    applied = failed = 0
+    with open(journal_path, 'a', encoding='utf-8') as f:
+        if mode == "resume":
+            for i, step in enumerate(steps):
+                if i in landed:
+                    continue
+                try:
+                    move(step["src"], step["dst"])
+                    _append(f, {"type": "done", "step": i}, sync=True)
+                    landed.append(i)
+                    applied += 1
+                except OSError as e:
+                    print(f"  [ERR] {Path(step['src']).name} -> {Path(step['dst']).name}: {e}")
+                    failed += 1
+                    break  # later steps may depend on this one (temp-name hops)
+        else:
+            for i in sorted(landed, reverse=True):
+                step = steps[i]
+                try:
+                    move(step["dst"], step["src"])
+                    _append(f, {"type": "undone", "step": i}, sync=True)
+                    applied += 1
+                except OSError as e:
+                    print(f"  [ERR] {Path(step['dst']).name} -> {Path(step['src']).name}: {e}")
+                    failed += 1
+                    break  # earlier steps may depend on this one being undone first
+
+    print(f"{mode.capitalize()}: {applied} steps applied, {failed} failed.")
+    if mode == "resume" and failed == 0:
+        # The interrupted tool never got to log the batch; record the steps that ran, in order
+        ran = [(steps[i]["src"], steps[i]["dst"]) for i in sorted(landed)]
+        # The blob store's names are only saved at commit, so replay them there too
+        for src, dst in ran:
+            BLOBS.follow_rename(src, dst)
+        BLOBS.save()
+        rename_history.append_run(header.get("meta", {}).get("tool", "rename_engine.py"), ran, history_path=history_path)
+    if failed == 0:
+        Path(journal_path).unlink()
+    return header
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or recover an interrupted rename batch.")
+    parser.add_argument("command", choices=["status", "resume", "rollback"])
+    args = parser.parse_args()
+
+    if args.command == "status":
+        state = read_journal()
+        if state is None:
+            print("No rename journal found.")
+            return
+        header, done, committed = state
+        print(f"Batch {header['id']} ({len(header['moves'])} renames, {len(header['steps'])} steps)")
+        print(f"  {len(done)} steps recorded done, committed: {committed}")
+    else:
+        recover(args.command)
+
+if __name__ == "__main__":
+    main()
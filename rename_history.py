@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import uuid
+import argparse
+import threading
+from pathlib import Path, PureWindowsPath
+from concurrent.futures import ThreadPoolExecutor
+
+from logo_index import INDEX, is_logo_file
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+LOGOS_DIR = BASE_DIR / "Logos"
+HISTORY_FILE = BASE_DIR / "rename_history.jsonl"
+LEGACY_UNDO_LOG = BASE_DIR / "undo_log.json"
+
+UNDO_WORKERS = 8
+
+# ==================================================================================
+# PATHS
+# ==================================================================================
+def to_rel(path_str):
+    """
+    Path relative to Logos/, as posix. Accepts relative paths and absolute ones from
+    any machine, including the old C:\\Users\\...\\Logos\\... entries in undo_log.json.
+    """
+    path_str = str(path_str)
+    try:
+        return Path(path_str).relative_to(LOGOS_DIR).as_posix()
+    except ValueError:
+        pass
+    parts = PureWindowsPath(path_str).parts if "\\" in path_str else Path(path_str).parts
+    lowered = [p.lower() for p in parts]
+    if "logos" in lowered:
+        idx = len(lowered) - 1 - lowered[::-1].index("logos")
+        parts = parts[idx + 1:]
+    return "/".join(parts)
+
+
+def to_abs(rel_path):
+    return LOGOS_DIR / rel_path
+
+
+def name_present(path):
+    """Index lookup for logo names; the .rename-*.tmp parking names of a cycle aren't indexed, so those hit the disk."""
+    path = Path(path)
+    return INDEX.name_taken(path) if is_logo_file(path.name) else path.exists()
+
+# ==================================================================================
+# HISTORY
+# ==================================================================================
+def read_history(history_path=HISTORY_FILE):
+    """Returns every record in file order. A torn last line from a crash is ignored."""
+    records = []
+    if not Path(history_path).exists():
+        return records
+    with open(history_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records
+
+
+def append_run(tool, renames, kind="rename", undoes=None, history_path=HISTORY_FILE):
+    """
+    Appends one run to the history. `renames` is a list of (old_path, new_path).
+    Returns the run id. Older runs are never rewritten.
+    """
+    if not renames:
+        return None
+    run_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+    now = time.time()
+    with open(history_path, 'a', encoding='utf-8') as f:
+        for old_path, new_path in renames:
+            record = {"run": run_id, "time": now, "tool": tool, "kind": kind,
+                      "old": to_rel(old_path), "new": to_rel(new_path)}
+            if undoes:
+                record["undoes"] = undoes
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return run_id
+
+
+def import_legacy_undo_log(history_path=HISTORY_FILE):
+    """Brings the single-run undo_log.json ({new: old}) into the history once."""
+    if not LEGACY_UNDO_LOG.exists():
+        return None
+    if any(r.get("tool") == "undo_log.json" for r in read_history(history_path)):
+        return None
+    with open(LEGACY_UNDO_LOG, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return append_run("undo_log.json", [(old, new) for new, old in data.items()], history_path=history_path)
+
+
+def summarize_runs(records):
+    """[(run_id, tool, kind, time, count)] in file order."""
+    runs = {}
+    for r in records:
+        if r["run"] not in runs:
+            runs[r["run"]] = [r["run"], r.get("tool"), r.get("kind"), r.get("time"), 0]
+        runs[r["run"]][4] += 1
+    return [tuple(v) for v in runs.values()]
+
+
+def pending_entries(records, run_id=None, sport=None, folder=None):
+    """
+    Rename entries that are still in effect and match the filters, oldest first.
+    An entry is no longer in effect once an undo run has reverted it.
+    """
+    reverted = {(r["undoes"], r["new"], r["old"]) for r in records if r.get("kind") == "undo"}
+    selected = []
+    for r in records:
+        if r.get("kind") != "rename":
+            continue
+        # The undo record swaps old/new, so the reverted key is (run, old, new)
+        if (r["run"], r["old"], r["new"]) in reverted:
+            continue
+        if run_id and r["run"] != run_id:
+            continue
+        if sport and r["new"].split("/")[0].lower() != sport.lower():
+            continue
+        if folder and not r["new"].lower().startswith(folder.strip("/").lower() + "/"):
+            continue
+        selected.append(r)
+    return selected
+
+# ==================================================================================
+# UNDO
+# ==================================================================================
+def schedule_waves(entries):
+    """
+    Groups reversals into waves that can run in parallel.
+    Entries are undone newest first. An entry goes in the wave after the last earlier
+    reversal that touched either of its paths, so dependent renames (A->B then B->C)
+    still unwind in order, while unrelated ones share a wave.
+    """
+    last_wave = {}
+    waves = []
+    for entry in reversed(entries):
+        keys = [entry["old"].casefold(), entry["new"].casefold()]
+        wave = max((last_wave.get(k, -1) for k in keys), default=-1) + 1
+        for k in keys:
+            last_wave[k] = wave
+        if wave == len(waves):
+            waves.append([])
+        waves[wave].append(entry)
+    return waves
+
+
+def undo(entries, workers=UNDO_WORKERS, dry_run=False, history_path=HISTORY_FILE):
+    """Reverts the given entries. Returns (reverted, failed)."""
+    # blob_store builds on this module's history helpers, so it can't be imported at the top
+    from blob_store import BLOBS
+    waves = schedule_waves(entries)
+
+    # Existence checks are LogoIndex lookups instead of a stat() per entry
+    lock = threading.Lock()
+    reverted = []
+    failed = []
+
+    def revert(entry):
+        new_path, old_path = to_abs(entry["new"]), to_abs(entry["old"])
+        with lock:
+            if not name_present(new_path):
+                return entry, "missing"
+            if name_present(old_path) and old_path.name.casefold() != new_path.name.casefold():
+                return entry, "original name is taken"
+        if dry_run:
+            return entry, None
+        try:
+            os.rename(new_path, old_path)
+        except OSError as e:
+            return entry, str(e)
+        INDEX.rename(new_path, old_path)
+        return entry, None
+
+    for wave in waves:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for entry, error in executor.map(revert, wave):
+                if error:
+                    failed.append((entry, error))
+                    print(f" failed: {entry['new']} -> {error}")
+                else:
+                    reverted.append(entry)
+                    print(f" reverted: {Path(entry['new']).name} -> {Path(entry['old']).name}")
+
+    if reverted and not dry_run:
+        # Log the reversal per original run so those entries are not undone twice
+        by_run = {}
+        for entry in reverted:
+            by_run.setdefault(entry["run"], []).append((to_abs(entry["new"]), to_abs(entry["old"])))
+        for run_id, pairs in by_run.items():
+            append_run("rename_history.py", pairs, kind="undo", undoes=run_id, history_path=history_path)
+        if BLOBS.active():
+            # The name layer takes the reversal as one recorded batch of name edits, in the order
+            # the files moved; the blob store's own 'undo' only replays its 'rename' runs
+            names = [(BLOBS.name(to_abs(e["new"])), BLOBS.name(to_abs(e["old"]))) for e in reverted]
+            BLOBS.rename_many(names, tool="rename_history.py", kind="undo")
+    return reverted, failed
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rename history across runs, with selective undo.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List recorded runs.")
+    sub.add_parser("import-legacy", help="Import the old single-run undo_log.json.")
+
+    undo_p = sub.add_parser("undo", help="Revert renames.")
+    which = undo_p.add_mutually_exclusive_group()
+    which.add_argument("--run", help="Run id to revert (see 'list').")
+    which.add_argument("--last", action="store_true", help="Revert the most recent rename run (default).")
+    which.add_argument("--all", action="store_true", help="Revert every rename still in effect.")
+    undo_p.add_argument("--sport", help="Only files under this sport folder (e.g. Soccer).")
+    undo_p.add_argument("--folder", help="Only files under this folder, relative to Logos/ (e.g. 'Soccer/USA MLS').")
+    undo_p.add_argument("--workers", type=int, default=UNDO_WORKERS)
+    undo_p.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "import-legacy":
+        run_id = import_legacy_undo_log()
+        print(f"Imported legacy undo log as run {run_id}." if run_id else "Nothing to import.")
+        return
+
+    import_legacy_undo_log()
+    records = read_history()
+
+    if args.command == "list":
+        for run_id, tool, kind, when, count in summarize_runs(records):
+            stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(when)) if when else "?"
+            still = len(pending_entries(records, run_id)) if kind == "rename" else 0
+            print(f"  {run_id:<24} {stamp}  {kind:<7} {tool:<18} {count:>5} entries  ({still} in effect)")
+        return
+
+    run_id = args.run
+    if not run_id and not args.all:
+        rename_runs = [r for r in summarize_runs(records) if r[2] == "rename"]
+        live = [r for r in rename_runs if pending_entries(records, r[0])]
+        if not live:
+            print("Nothing to undo.")
+            return
+        run_id = live[-1][0]
+
+    entries = pending_entries(records, run_id, args.sport, args.folder)
+    print(f"Reverting {len(entries)} files{f' from run {run_id}' if run_id else ''}...")
+    reverted, failed = undo(entries, workers=args.workers, dry_run=args.dry_run)
+    print(f"\n{len(reverted)} reverted, {len(failed)} failed.")
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,97 @@
 import os
 import csv
 import json
-import requests
 import shutil
 from pathlib import Path
-import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import openrouter_client
+from candidate_index import simplify_text
+from logo_index import INDEX
+from blob_store import BLOBS
+from llm_cache import CACHE as LLM_CACHE, fingerprint, make_key
 
 # Configuration
 OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY", "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")
 OPENROUTER_MODEL = "google/gemini-2.0-flash-001" # Using the same model as in Normalize.py
+PROMPT_VERSION = "renamer-v1" # Bump when the prompt below changes so cached answers are not reused
+BATCH_PROMPT_VERSION = "renamer-batch-v1"
+ROW_BATCH_SIZE = int(os.environ.get("RENAMER_BATCH_SIZE", "25")) # Rows resolved per LLM request
+# Lookups in flight at once, and the request rate they share (halved on 429, then recovers)
+CONCURRENCY = int(os.environ.get("RENAMER_CONCURRENCY", "4"))
+REQUESTS_PER_SECOND = float(os.environ.get("RENAMER_RPS", "2"))
+REQUEST_TIMEOUT = float(os.environ.get("RENAMER_TIMEOUT", "120"))
+RATE_LIMITER = openrouter_client.TokenBucket(REQUESTS_PER_SECOND, capacity=CONCURRENCY)
 BASE_DIR = Path(__file__).parent
 LOGOS_DIR = BASE_DIR / "Logos"
 CSV_FILE = BASE_DIR / "logo.csv"
-OUTPUT_CSV_FILE = BASE_DIR / "logo_updated.csv" # Write to a new file first, then replace or user can review
-# User said "change the status column ... iterate thru the entire file" - implies in-place or update. 
-# I will write to a temp file and then overwrite if successful, or just write to logo_updated.csv for safety.
-# Actually user said "create a program that reads...".
-# I'll stick to updating a new file `logo_processed.csv` to avoid destroying data, and print that I did so.
-
-def get_all_logo_files(root_dir):
-    """Recursively finding all files in Logos directory."""
-    file_list = []
-    for root, dirs, files in os.walk(root_dir):
-        for file in files:
-            if file.startswith('.') or file.lower().endswith('.ini'):
-                continue
-            # Store relative path from Logos root for easier context
-            abs_path = Path(root) / file
-            rel_path = abs_path.relative_to(root_dir)
-            file_list.append(str(rel_path))
-    return file_list
+PARTIAL_CSV_FILE = BASE_DIR / "logo.csv.partial" # Rows written so far; replaces logo.csv at the end
+CHECKPOINT_FILE = BASE_DIR / "logo.csv.checkpoint.json"
+CHECKPOINT_EVERY = int(os.environ.get("RENAMER_CHECKPOINT_EVERY", "100")) # Rows between durable checkpoints
+# User said "change the status column ... iterate thru the entire file" - updated in place, via the partial file above.
+
+def folder_affinity(rel_path, row):
+    """How many words the file's folders share with the row's sport, league and preferred path."""
+    folder_words = set(simplify_text(str(Path(rel_path).parent).replace("-", " ")).split())
+    row_text = " ".join([
+        row.get('SPORT_ID') or "", row.get('LEAGUE_ID') or "", row.get('LEAGUE_NAME') or "",
+        str(Path(row.get('PREFERRED_FILE_PATH') or "").parent).replace("-", " ")
+    ])
+    return len(folder_words & set(simplify_text(row_text).split()))
+
+def prematch_row(row):
+    """
+    Deterministic match for the obvious rows, before any LLM call.
+    Tries PREFERRED_FILE_NAME, SGO_FORMAT, NAME and CURRENT_PATH stems against the
+    LogoIndex stem lookup (which follows every rename made so far) in turn. A single
+    hit wins outright; several hits are broken by league-folder affinity, and only a clear winner counts.
+    """
+    keys = [row.get('PREFERRED_FILE_NAME'), row.get('SGO_FORMAT'), row.get('NAME')]
+    if row.get('CURRENT_PATH') and row['CURRENT_PATH'] != "NONE":
+        keys.append(row['CURRENT_PATH'])
+        
+    for key in keys:
+        if not key:
+            continue
+        hits = INDEX.by_stem(key)
+        if len(hits) == 1:
+            return {"matched_file": hits[0], "confidence": 0.99, "source": "prematch"}
+        if len(hits) > 1:
+            scored = sorted(((folder_affinity(h, row), h) for h in hits), reverse=True)
+            if scored[0][0] > 0 and scored[0][0] > scored[1][0]:
+                return {"matched_file": scored[0][1], "confidence": 0.9, "source": "prematch"}
+    return None
+
+def candidate_files(row):
+    """
+    The files a single-row lookup is asked about: the folder the row's PREFERRED_FILE_PATH
+    points at, else the folders sharing the most words with the row, else every file.
+    The answer is cached under this listing, so renames in other folders leave it valid.
+    """
+    folder = Path(row.get('PREFERRED_FILE_PATH') or "").parent.as_posix()
+    if folder != ".":
+        files = INDEX.in_folder(folder)
+        if files:
+            return files
+    scored = [(folder_affinity(f"{f}/_", row), f) for f in INDEX.folder_names()]
+    best = max((score for score, _ in scored), default=0)
+    if best > 0:
+        return [p for score, f in scored if score == best for p in INDEX.in_folder(f)]
+    return INDEX.all_files()
 
 def find_logo_match_with_llm(team_name, sport_id, league_name, available_files):
     """
     Uses LLM to find the best matching filename for a given team.
+    Answers are cached by (model, prompt version, entity, file list), so reruns only pay for changed inputs.
+    Callers pass candidate_files(row), so a rename elsewhere in Logos/ doesn't change the key.
     """
-    url = "https://openrouter.ai/api/v1/chat/completions"
+    cache_key = make_key(OPENROUTER_MODEL, PROMPT_VERSION, [team_name, sport_id, league_name], fingerprint(available_files))
+    cached = LLM_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
@@ -74,146 +130,357 @@ def find_logo_match_with_llm(team_name, sport_id, league_name, available_files):
         "response_format": {"type": "json_object"}
     }
     
-    retries = 3
-    for attempt in range(retries):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            if response.status_code == 429:
-                time.sleep(2 * (attempt + 1))
-                continue
-            response.raise_for_status()
-            result = response.json()
-            content = result['choices'][0]['message']['content']
-            parsed = json.loads(content)
-            if isinstance(parsed, list):
-                if len(parsed) > 0:
-                    return parsed[0]
-                return None
-            return parsed
-        except Exception as e:
-            print(f"Error checking LLM for {team_name}: {e}")
-            time.sleep(1)
+    # 429 Retry-After, 5xx backoff and the shared request rate are handled by post_chat
+    try:
+        result = openrouter_client.post_chat(payload, headers, limiter=RATE_LIMITER, timeout=REQUEST_TIMEOUT)
+        content = result['choices'][0]['message']['content']
+        parsed = json.loads(content)
+        if isinstance(parsed, list):
+            parsed = parsed[0] if len(parsed) > 0 else None
+        if parsed is not None:
+            LLM_CACHE.put(cache_key, parsed, label=team_name, source=f"renamer:{sport_id}")
+            LLM_CACHE.save()
+        return parsed
+    except Exception as e:
+        print(f"Error checking LLM for {team_name}: {e}")
     return None
 
-def main():
-    if not CSV_FILE.exists():
-        print(f"Error: {CSV_FILE} not found.")
-        return
+def find_logo_matches_batch(entities, available_files):
+    """
+    Resolves many rows in one request against a shared file list. Answers are cached
+    under that list's fingerprint, so callers send only the files the rows could match.
+    `entities` is a list of (row_id, name, sport, league). Returns {row_id: match dict}
+    for every row the model answered; unanswered rows are simply absent.
+    """
+    files_fp = fingerprint(available_files)
+    keys = {rid: make_key(OPENROUTER_MODEL, BATCH_PROMPT_VERSION, [name, sport, league], files_fp)
+            for rid, name, sport, league in entities}
+    
+    results = {}
+    pending = []
+    for entity in entities:
+        cached = LLM_CACHE.get(keys[entity[0]])
+        if cached is not None:
+            results[entity[0]] = cached
+        else:
+            pending.append(entity)
+    if not pending:
+        return results
 
-    print("Indexing Logos directory...")
-    all_files = get_all_logo_files(LOGOS_DIR)
-    print(f"Found {len(all_files)} files.")
+    headers = {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "https://bet2fund.com",
+    }
+    targets = [{"id": rid, "name": name, "sport": sport, "league": league} for rid, name, sport, league in pending]
+
+    prompt = f"""
+    You are a helpful assistant that matches sports teams/entities to files in a file list.
     
-    # Read CSV
-    rows = []
-    with open(CSV_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames
-        for row in reader:
-            rows.append(row)
-            
-    updates_made = 0
+    TARGET ENTITIES:
+    {json.dumps(targets)}
     
-    print(f"Processing {len(rows)} records...")
+    TASK:
+    For EACH target entity, find the file in the provided list that most likely corresponds to it.
+    Use the relative paths exactly as provided. If no good match is found, use null.
     
-    for i, row in enumerate(rows):
-        name = row.get('NAME')
-        sport = row.get('SPORT_ID')
-        league = row.get('LEAGUE_NAME')
-        preferred_name = row.get('PREFERRED_FILE_NAME')
-        current_status = row.get('STATUS')
-        
-        # User condition: "if this was done- change the status column to DONE otherwise leave alone."
-        # If status is already DONE or "✅ Logo exists", maybe skip?
-        # User said: "create a program that reads in a single row ... iterate thru the entire file"
-        # I'll enable skipping processed ones to save API calls if re-run.
-        if "✅" in current_status or "DONE" in current_status:
-           # print(f"[{i+1}/{len(rows)}] Skipping {name} (Already DONE)")
-            continue
-            
-        print(f"[{i+1}/{len(rows)}] Processing {name} ({sport})...", end="", flush=True)
-        
-        # Filter files by sport if possible to reduce token usage?
-        # A simple string match on sport might help, but let's just pass all for now if < 1000.
-        # But wait, Sport ID in CSV: "SOCCER", "BASKETBALL".
-        # Directory names: "Soccer", "Basketball".
-        # We can case-insensitive match.
-        
-        relevant_files = []
-        sport_lower = sport.lower()
-        if sport_lower == "ncaab": sport_lower = "college" # Special case mappings?
-        if sport_lower == "ufc": sport_lower = "mixed martial arts"
-        
-        # If we can narrow down, good. If not, pass all. 
-        # Actually 800 items is fine. Let's filter slightly to be safe against errors or context limits.
-        # But if the file is in a weird place, we might miss it.
-        # Let's pass ALL files. 839 is manageable.
+    AVAILABLE FILES:
+    {json.dumps(available_files)}
+    
+    RESPONSE FORMAT:
+    {{
+        "matches": [
+            {{"id": "<target id>", "matched_file": "path/to/file.png" OR null, "confidence": 0.95}}
+        ]
+    }}
+    """
+    
+    payload = {
+        "model": OPENROUTER_MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a JSON-speaking file matcher."},
+            {"role": "user", "content": prompt}
+        ],
+        "response_format": {"type": "json_object"}
+    }
+    
+    try:
+        result = openrouter_client.post_chat(payload, headers, limiter=RATE_LIMITER, timeout=REQUEST_TIMEOUT)
+        content = result['choices'][0]['message']['content']
+        parsed = json.loads(content)
+        matches = parsed.get('matches', []) if isinstance(parsed, dict) else parsed
+    except Exception as e:
+        print(f"Error checking LLM for batch of {len(pending)}: {e}")
+        return results
         
-        match_result = find_logo_match_with_llm(name, sport, league, all_files)
+    names = {rid: name for rid, name, _, _ in pending}
+    for match in matches or []:
+        rid = str(match.get('id')) if isinstance(match, dict) else None
+        if rid in names:
+            results[rid] = match
+            LLM_CACHE.put(keys[rid], match, label=names[rid], source="renamer-batch")
+    LLM_CACHE.save()
+    return results
+
+def apply_match(row, match_result, claims=None):
+    """
+    Renames the matched file to PREFERRED_FILE_NAME and updates the row's STATUS. Returns True on rename.
+    `claims` maps every file already taken this run (by its old or new path) to the row that took it,
+    so two rows matched to the same file can't both rename it.
+    """
+    preferred_name = row.get('PREFERRED_FILE_NAME')
+    
+    if match_result and match_result.get('matched_file'):
+        matched_rel_path = match_result['matched_file']
+        confidence = match_result.get('confidence', 0)
         
-        if match_result and match_result.get('matched_file'):
-            matched_rel_path = match_result['matched_file']
-            confidence = match_result.get('confidence', 0)
+        if confidence > 0.8: # Threshold
+            # Found a match
+            full_src_path = LOGOS_DIR / matched_rel_path
+            claim_key = Path(matched_rel_path).as_posix().casefold()
             
-            if confidence > 0.8: # Threshold
-                # Found a match
-                full_src_path = LOGOS_DIR / matched_rel_path
-                
-                if not full_src_path.exists():
+            if claims is not None and claim_key in claims:
+                print(f" -> {matched_rel_path} already taken by {claims[claim_key]}.")
+                row['STATUS'] = f"Conflict: file used by {claims[claim_key]}"
+                return False
+            if not INDEX.exists(full_src_path):
+                # The index only knows this process's changes; trust the disk before rejecting
+                if not full_src_path.is_file():
                     print(f" -> LLM hallucinates path {matched_rel_path}")
-                    continue
-                    
-                # Determining destination
-                # User: "renames the file that it finds ... as in PREFERRED_FILE_NAME"
-                # Keep the same directory?
-                # or use PREFERRED_FILE_PATH?
-                # PREFERRED_FILE_PATH might assume a folder structure that doesn't exist yet if the file looks different.
-                # Use current directory of the found file + new name.
-                
-                new_filename = preferred_name
-                dst_path = full_src_path.parent / new_filename
+                    row['STATUS'] = "No Match Found"
+                    return False
+                INDEX.add(full_src_path)
                 
-                # Check if rename is actually needed
-                if full_src_path.name == new_filename:
-                    print(f" -> Already named correctly.")
-                    row['STATUS'] = "DONE"
-                else:
-                    try:
-                        if dst_path.exists():
-                             print(f" -> Target {dst_path.name} already exists. Skipping overwrite.")
-                             # Maybe mark DONE if it exists?
-                        else:
-                            os.rename(full_src_path, dst_path)
-                            print(f" -> Renamed to {new_filename}")
-                            row['STATUS'] = "DONE"
-                            updates_made += 1
-                            
-                            # Update our internal list of files? 
-                            # If we renamed it, 'matched_rel_path' is no longer valid.
-                            # But we are iterating, so it should be fine.
-                            # Need to update 'all_files' list if we want to be perfectly correct for subsequent calls,
-                            # but unlikely to conflict unless duplicates exist.
-                    except Exception as e:
-                        print(f" -> Rename failed: {e}")
+            # Keep the directory the file was found in; only the name changes
+            new_filename = preferred_name
+            dst_path = full_src_path.parent / new_filename
+            
+            # Check if rename is actually needed
+            if full_src_path.name == new_filename:
+                print(f" -> Already named correctly.")
+                row['STATUS'] = "DONE"
+                if claims is not None:
+                    claims[claim_key] = row.get('NAME')
             else:
-                 print(f" -> Low confidence ({confidence})")
-                 row['STATUS'] = f"Low Confidence: {confidence}"
+                try:
+                    if INDEX.name_taken(dst_path):
+                         print(f" -> Target {dst_path.name} already exists. Skipping overwrite.")
+                    else:
+                        os.rename(full_src_path, dst_path)
+                        INDEX.rename(full_src_path, dst_path)
+                        BLOBS.follow_rename(full_src_path, dst_path)
+                        print(f" -> Renamed to {new_filename}")
+                        row['STATUS'] = "DONE"
+                        if claims is not None:
+                            claims[claim_key] = row.get('NAME')
+                            claims[dst_path.relative_to(LOGOS_DIR).as_posix().casefold()] = row.get('NAME')
+                        return True
+                except Exception as e:
+                    print(f" -> Rename failed: {e}")
         else:
-            print(f" -> No match found.")
-            row['STATUS'] = "No Match Found"
+             print(f" -> Low confidence ({confidence})")
+             row['STATUS'] = f"Low Confidence: {confidence}"
+    else:
+        print(f" -> No match found.")
+        row['STATUS'] = "No Match Found"
+    return False
 
-    # Write output
-    # Overwrite the original file or new file?
-    # "change the status column ... iterate thru the entire file"
-    # I'll overwrite for seamless usage, but backup first.
-    shutil.copy(CSV_FILE, str(CSV_FILE) + ".bak")
+def needs_processing(row):
+    """Rows already DONE (or flagged as having a logo) are skipped to save API calls on re-runs."""
+    current_status = row.get('STATUS') or ""
+    return not ("✅" in current_status or "DONE" in current_status)
+
+def resolve_rows(numbered_rows, batch_size):
+    """
+    Resolves rows `batch_size` at a time, one request per batch, each sent the union of
+    its rows' candidate_files. Rows the batch leaves unanswered, answers with no file, or
+    answers with a path that doesn't exist, fall back to a single-row request over the
+    row's own candidate_files. Returns [(index, row, match_result)] in input order.
+    Answers are checked against the live index: chunks resolve ahead of the renames of
+    earlier chunks, so the list they were sent may already be stale.
+    """
+    resolved = []
+    for start in range(0, len(numbered_rows), batch_size):
+        chunk = numbered_rows[start:start + batch_size]
+        batch_results = {}
+        if batch_size > 1:
+            print(f"Rows {chunk[0][0] + 1}-{chunk[-1][0] + 1}: resolving {len(chunk)} rows in one request...")
+            batch_results = find_logo_matches_batch(
+                [(str(i), row.get('NAME'), row.get('SPORT_ID'), row.get('LEAGUE_NAME')) for i, row in chunk],
+                sorted({path for _, row in chunk for path in candidate_files(row)})
+            )
+        for i, row in chunk:
+            result = batch_results.get(str(i))
+            if result is None or not result.get('matched_file') or not INDEX.exists(result['matched_file']):
+                result = find_logo_match_with_llm(row.get('NAME'), row.get('SPORT_ID'), row.get('LEAGUE_NAME'),
+                                                  candidate_files(row))
+            resolved.append((i, row, result))
+    return resolved
+
+def load_checkpoint():
+    """Returns the checkpoint if it belongs to the current logo.csv, else None."""
+    if not CHECKPOINT_FILE.exists() or not PARTIAL_CSV_FILE.exists():
+        return None
+    try:
+        with open(CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except Exception:
+        return None
+    stat = CSV_FILE.stat()
+    if state.get('source_size') != stat.st_size or state.get('source_mtime_ns') != stat.st_mtime_ns:
+        print("Checkpoint is for a different logo.csv; starting over.")
+        return None
+    if PARTIAL_CSV_FILE.stat().st_size < state.get('partial_bytes', 0):
+        return None
+    return state
+
+def write_checkpoint(out, rows_done, updates_made):
+    """Makes the partial output durable, then atomically swaps in a new checkpoint record."""
+    out.flush()
+    os.fsync(out.fileno())
+    stat = CSV_FILE.stat()
+    state = {
+        "rows_done": rows_done,
+        "updates_made": updates_made,
+        "partial_bytes": PARTIAL_CSV_FILE.stat().st_size,
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns
+    }
+    tmp_path = CHECKPOINT_FILE.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, CHECKPOINT_FILE)
+
+def iter_chunks(reader, size):
+    chunk = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def resolve_chunk(numbered_rows, batch_size):
+    """
+    Network half of a chunk: pre-match, then LLM-resolve whatever is left. Touches no
+    files, so several chunks can resolve side by side. The file list is taken from the
+    LogoIndex when the chunk starts, so it includes renames made by earlier chunks.
+    Returns [(index, row, match_result)] in row order.
+    """
+    # Rows already DONE / with a logo are left alone
+    pending = [(i, row) for i, row in numbered_rows if needs_processing(row)]
     
-    with open(CSV_FILE, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    # Deterministic pre-match: only rows it can't resolve go to the LLM
+    prematched = []
+    unresolved = []
+    for i, row in pending:
+        match_result = prematch_row(row)
+        if match_result:
+            prematched.append((i, row, match_result))
+        else:
+            unresolved.append((i, row))
+            
+    resolved = resolve_rows(unresolved, batch_size) if unresolved else []
+    return sorted(prematched + resolved, key=lambda item: item[0])
+
+def apply_chunk(resolved, claims):
+    """Disk half of a chunk: renames in row order, on the caller's thread only. Returns renames made."""
+    updates_made = 0
+    for i, row, match_result in resolved:
+        print(f"[{i+1}] {row.get('NAME')} ({row.get('SPORT_ID')})", end="", flush=True)
+        if apply_match(row, match_result, claims):
+            updates_made += 1
+    return updates_made
+
+def main(batch_size=ROW_BATCH_SIZE, restart=False, concurrency=CONCURRENCY):
+    """
+    Streams logo.csv in chunks so memory stays flat however large the catalog is.
+    Updated rows go to logo.csv.partial and a checkpoint is committed every
+    CHECKPOINT_EVERY rows, so an interrupted run resumes where it stopped. The
+    original is only replaced (atomically, after a .bak copy) once every row is written.
+
+    Up to `concurrency` chunks resolve ahead on worker threads, all drawing on
+    RATE_LIMITER. Renames and CSV writes stay on this thread in row order, so
+    which row wins a contested file never depends on which request returned first.
+    """
+    if not CSV_FILE.exists():
+        print(f"Error: {CSV_FILE} not found.")
+        return
+
+    print("Indexing Logos directory...")
+    print(f"Found {len(INDEX.all_files())} files.")
+    
+    state = None if restart else load_checkpoint()
+    rows_done = state['rows_done'] if state else 0
+    updates_made = state['updates_made'] if state else 0
+    
+    with open(CSV_FILE, 'r', newline='', encoding='utf-8') as src:
+        reader = csv.DictReader(src)
+        fieldnames = reader.fieldnames
+        
+        if state:
+            print(f"Resuming after row {rows_done} ({updates_made} renames so far).")
+            # Drop anything written after the last checkpoint; those rows are redone
+            os.truncate(PARTIAL_CSV_FILE, state['partial_bytes'])
+            out = open(PARTIAL_CSV_FILE, 'a', newline='', encoding='utf-8')
+            writer = csv.DictWriter(out, fieldnames=fieldnames)
+            for _ in range(rows_done):
+                next(reader, None)
+        else:
+            out = open(PARTIAL_CSV_FILE, 'w', newline='', encoding='utf-8')
+            writer = csv.DictWriter(out, fieldnames=fieldnames)
+            writer.writeheader()
+            
+        workers = max(1, concurrency)
+        with out, ThreadPoolExecutor(max_workers=workers) as executor:
+            since_checkpoint = 0
+            rows_read = rows_done
+            claims = {}
+            in_flight = deque()
+            chunks = iter_chunks(reader, max(batch_size, 1))
+            while True:
+                # Keep `workers` chunks resolving ahead of the writer
+                while len(in_flight) < workers:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    numbered = list(enumerate(chunk, rows_read))
+                    rows_read += len(chunk)
+                    in_flight.append((chunk, executor.submit(resolve_chunk, numbered, batch_size)))
+                if not in_flight:
+                    break
+                
+                chunk, future = in_flight.popleft()
+                updates_made += apply_chunk(future.result(), claims)
+                writer.writerows(chunk)
+                rows_done += len(chunk)
+                since_checkpoint += len(chunk)
+                if since_checkpoint >= CHECKPOINT_EVERY:
+                    write_checkpoint(out, rows_done, updates_made)
+                    BLOBS.save()
+                    since_checkpoint = 0
+            out.flush()
+            os.fsync(out.fileno())
+
+    # Overwrite the original file for seamless usage, but backup first.
+    shutil.copy(CSV_FILE, str(CSV_FILE) + ".bak")
+    os.replace(PARTIAL_CSV_FILE, CSV_FILE)
+    if CHECKPOINT_FILE.exists():
+        CHECKPOINT_FILE.unlink()
+    BLOBS.save()
         
-    print(f"\nCompleted. {updates_made} files renamed. CSV updated.")
+    print(f"\nCompleted. {rows_done} records, {updates_made} files renamed. CSV updated.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Match logo.csv rows to files in Logos/ and rename them.")
+    parser.add_argument("--batch-size", type=int, default=ROW_BATCH_SIZE,
+                        help="Rows resolved per LLM request (1 = one request per row).")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore any checkpoint from an interrupted run and start from the first row.")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="Row lookups (batches) in flight at once; they share one rate limit.")
+    args = parser.parse_args()
+    main(batch_size=args.batch_size, restart=args.restart, concurrency=args.concurrency)
@@ -0,0 +1,322 @@
+import os
+import csv
+import mmap
+import struct
+import hashlib
+import argparse
+from pathlib import Path
+
+import sgo_cache
+from candidate_index import simplify_text
+from logo_index import INDEX
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+CSV_FILE = BASE_DIR / "logo.csv"
+INDEX_FILE = BASE_DIR / "resolution_index.bin"
+
+# Where an answer came from: the entity's own logo, a fallback, or a known miss
+LEVELS = ("own", "league", "sport", "none")
+OWN, LEAGUE, SPORT, NONE = range(4)
+
+IMAGE_SUFFIXES = {".gif", ".png", ".jpg", ".jpeg", ".webp", ".svg", ".bmp"}
+# logo.csv statuses that mean "looked for it, there is no file"
+MISSING_STATUSES = ("❌ MISSING", "No Match Found")
+
+# File layout (little endian, all offsets absolute):
+#   header   magic, version, slot count, entry count, path count, path table offset
+#   slots    (key hash u64, key offset u32, value u32) * slot count, open addressing
+#   paths    u32 offset per distinct logo path
+#   strings  u16 length + utf-8 bytes, for keys and paths
+MAGIC = b"LGRX"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxIIII")
+SLOT = struct.Struct("<QII")
+PATH_OFFSET = struct.Struct("<I")
+LENGTH = struct.Struct("<H")
+EMPTY = 0xFFFFFFFF
+PATH_BITS = 30
+
+# ==================================================================================
+# KEYS
+# ==================================================================================
+def entity_key(sport, league=None, name=None):
+    """'soccer', 'soccer/bundesliga' or 'soccer/bundesliga/augsburg', from any spelling of the parts."""
+    return "/".join(simplify_text(part) for part in (sport, league, name) if part)
+
+
+def id_key(sgo_id):
+    """SportsGameOdds teamID / leagueID, e.g. 'id:bayern_munich_bundesliga'."""
+    return "id:" + sgo_id.casefold()
+
+
+def normalize_key(text):
+    """Key for user input: 'id:<SGO id>', a PREFERRED_FILE_PATH ('soccer/x/augsburg.gif'), or 'sport[/league[/team]]'."""
+    text = text.strip("/")
+    if text.startswith("id:"):
+        return id_key(text[3:])
+    if Path(text).suffix.lower() in IMAGE_SUFFIXES:
+        return text.casefold()
+    return entity_key(*text.split("/")[:3])
+
+
+def key_hash(key):
+    # Fixed hash rather than hash(): the table is built by one process and probed by others
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+# ==================================================================================
+# BUILDING
+# ==================================================================================
+def best_file(names, context, strict=False):
+    """
+    The Logos/ file whose stem matches one of `names` and whose folders share the most
+    words with `context`. With strict, a file is only accepted if some folder word matches.
+    """
+    hits = sorted({h for name in names if name for h in INDEX.by_stem(name)})
+    if not hits:
+        return None
+    wanted = set(simplify_text(" ".join(c for c in context if c).replace("-", " ")).split())
+    scored = [(len(set(simplify_text(str(Path(h).parent)).split()) & wanted), h) for h in hits]
+    score, best = max(scored)
+    if strict and score == 0:
+        return None
+    return best
+
+
+def read_rows(csv_path=CSV_FILE):
+    if not Path(csv_path).exists():
+        return []
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def row_logo(row):
+    """Own logo of a logo.csv row, or None. Known misses are not looked up at all."""
+    if row.get('STATUS') in MISSING_STATUSES:
+        return None
+    current = row.get('CURRENT_PATH')
+    names = [row.get('PREFERRED_FILE_NAME'), Path(current).name if current and current != "NONE" else None]
+    if row.get('TYPE') == "LEAGUE":
+        names += [row.get('LEAGUE_ID'), row.get('LEAGUE_NAME'), row.get('NAME')]
+    context = [row.get('SPORT_ID'), row.get('LEAGUE_ID'), row.get('LEAGUE_NAME'),
+               str(Path(row.get('PREFERRED_FILE_PATH') or "").parent)]
+    return best_file(names, context)
+
+
+def load_catalog(sport_ids):
+    """(leagues, teams) from the SportsGameOdds catalog cache; empty if it can't be reached."""
+    leagues, teams = [], []
+    for sport_id in sorted(sport_ids):
+        leagues.extend(sgo_cache.get_leagues(sport_id))
+        teams.extend(sgo_cache.get_teams(sport_id))
+    return leagues, teams
+
+
+def collect(rows, leagues=(), teams=()):
+    """
+    Joins logo.csv, the Logos tree and the catalog into {key: (logo path or None, level)}.
+    The fallback chain team -> league -> sport is resolved here, once, so a lookup never walks it.
+    """
+    sports = {}         # sport key -> path or None
+    league_logo = {}    # league key -> path or None
+    team_logo = {}      # team key -> path or None
+    aliases = {}        # extra key (PREFERRED_FILE_PATH, SGO id) -> team / league key
+    league_names = {}   # league key -> names a league logo file might carry
+
+    for row in rows:
+        sport, league = row.get('SPORT_ID') or "", row.get('LEAGUE_ID') or ""
+        sports.setdefault(entity_key(sport), None)
+        if row.get('TYPE') == "LEAGUE":
+            key = entity_key(sport, league)
+            league_logo[key] = league_logo.get(key) or row_logo(row)
+        else:
+            key = entity_key(sport, league, row.get('NAME'))
+            team_logo[key] = team_logo.get(key) or row_logo(row)
+            league_logo.setdefault(entity_key(sport, league), None)
+        league_names.setdefault(entity_key(sport, league), set()).update({league, row.get('LEAGUE_NAME')})
+        if row.get('PREFERRED_FILE_PATH'):
+            aliases[row['PREFERRED_FILE_PATH'].strip("/").casefold()] = key
+
+    for entry in leagues:
+        if not entry.get('leagueID') or not entry.get('sportID'):
+            continue
+        key = entity_key(entry['sportID'], entry['leagueID'])
+        sports.setdefault(entity_key(entry['sportID']), None)
+        if league_logo.get(key) is None:
+            league_logo[key] = best_file([entry['leagueID'], entry.get('name'), entry.get('shortName')],
+                                         [entry['sportID'], entry.get('name')], strict=True)
+        aliases[id_key(entry['leagueID'])] = key
+
+    for entry in teams:
+        if not entry.get('teamID') or not entry.get('sportID') or not entry.get('leagueID'):
+            continue
+        names = entry.get('names', {})
+        candidates = [entity_key(entry['sportID'], entry['leagueID'], n)
+                      for n in (names.get('medium'), names.get('short'), names.get('long')) if n]
+        # A catalog team that logo.csv already covers shares its entry; otherwise it gets its own
+        key = next((k for k in candidates if k in team_logo), candidates[0] if candidates else None)
+        if key is None:
+            continue
+        if key not in team_logo:
+            team_logo[key] = best_file([names.get('medium'), names.get('long'), names.get('short')],
+                                       [entry['sportID'], entry['leagueID']], strict=True)
+        league_logo.setdefault(entity_key(entry['sportID'], entry['leagueID']), None)
+        sports.setdefault(entity_key(entry['sportID']), None)
+        aliases[id_key(entry['teamID'])] = key
+
+    # Leagues only ever seen through their teams (e.g. NFL) still have a logo: Football/NFL.gif
+    for key, path in league_logo.items():
+        if path is None:
+            league_logo[key] = best_file(league_names.get(key, [key.split("/")[-1]]), [key.split("/")[0]], strict=True)
+    for key in sports:
+        sports[key] = best_file([key], [key])
+
+    def first_logo(*candidates):
+        return next(((path, level) for path, level in candidates if path), (None, NONE))
+
+    entries = {}
+    for key, path in sports.items():
+        entries[key] = first_logo((path, OWN))
+    for key, path in league_logo.items():
+        entries[key] = first_logo((path, OWN), (sports.get(key.split("/")[0]), SPORT))
+    for key, path in team_logo.items():
+        entries[key] = first_logo((path, OWN), (league_logo.get(key.rsplit("/", 1)[0]), LEAGUE),
+                                  (sports.get(key.split("/")[0]), SPORT))
+    for alias, key in aliases.items():
+        entries.setdefault(alias, entries[key])
+    return entries
+
+
+def encode(entries):
+    """Packs {key: (path or None, level)} into the on-disk layout."""
+    paths = sorted({path for path, _ in entries.values() if path})
+    path_ids = {path: i for i, path in enumerate(paths)}
+    n_slots = 1
+    while n_slots < len(entries) * 2:
+        n_slots <<= 1
+    mask = n_slots - 1
+
+    slots_offset = HEADER.size
+    paths_offset = slots_offset + n_slots * SLOT.size
+    strings = bytearray()
+    strings_offset = paths_offset + len(paths) * PATH_OFFSET.size
+
+    def add_string(text):
+        offset = strings_offset + len(strings)
+        data = text.encode("utf-8")
+        strings.extend(LENGTH.pack(len(data)) + data)
+        return offset
+
+    path_offsets = [add_string(path) for path in paths]
+    slots = [(0, EMPTY, 0)] * n_slots
+    for key, (path, level) in sorted(entries.items()):
+        value = (level << PATH_BITS) | (path_ids[path] if path else (1 << PATH_BITS) - 1)
+        h = key_hash(key)
+        i = h & mask
+        while slots[i][1] != EMPTY:
+            i = (i + 1) & mask
+        slots[i] = (h, add_string(key), value)
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, n_slots, len(entries), len(paths), paths_offset))
+    for slot in slots:
+        out.extend(SLOT.pack(*slot))
+    for offset in path_offsets:
+        out.extend(PATH_OFFSET.pack(offset))
+    out.extend(strings)
+    return bytes(out)
+
+
+def build(output=INDEX_FILE, use_catalog=True):
+    """Writes the index (temp file + rename) and returns the entries it holds."""
+    rows = read_rows()
+    leagues, teams = load_catalog({r['SPORT_ID'] for r in rows if r.get('SPORT_ID')}) if use_catalog else ([], [])
+    entries = collect(rows, leagues, teams)
+    output = Path(output)
+    tmp_path = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(encode(entries))
+    os.replace(tmp_path, output)
+    return entries
+
+# ==================================================================================
+# LOOKUP
+# ==================================================================================
+class ResolutionIndex:
+    """
+    Read side of the index: the file is mmap'd (or held as bytes) and probed in place,
+    one hash and usually one slot per lookup, with no filesystem access. Returns
+    (relative path under Logos/ or None, level name) for a known key, None for an unknown one.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        magic, version, self.n_slots, self.n_entries, self.n_paths, self.paths_offset = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a resolution index (or built by another version); rebuild it.")
+        self.mask = self.n_slots - 1
+
+    @classmethod
+    def open(cls, path=INDEX_FILE):
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _string(self, offset):
+        (length,) = LENGTH.unpack_from(self.data, offset)
+        return bytes(self.data[offset + LENGTH.size:offset + LENGTH.size + length])
+
+    def lookup(self, key):
+        h = key_hash(key)
+        wanted = key.encode("utf-8")
+        i = h & self.mask
+        while True:
+            slot_hash, key_offset, value = SLOT.unpack_from(self.data, HEADER.size + i * SLOT.size)
+            if key_offset == EMPTY:
+                return None
+            if slot_hash == h and self._string(key_offset) == wanted:
+                level = value >> PATH_BITS
+                if level == NONE:
+                    return None, LEVELS[NONE]
+                (path_offset,) = PATH_OFFSET.unpack_from(self.data, self.paths_offset + (value & ((1 << PATH_BITS) - 1)) * PATH_OFFSET.size)
+                return self._string(path_offset).decode("utf-8"), LEVELS[level]
+            i = (i + 1) & self.mask
+
+    def resolve(self, sport, league=None, team=None):
+        return self.lookup(entity_key(sport, league, team))
+
+    def resolve_id(self, sgo_id):
+        return self.lookup(id_key(sgo_id))
+
+    def resolve_path(self, preferred_file_path):
+        return self.lookup(normalize_key(preferred_file_path))
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed entity -> logo lookup with team -> league -> sport fallback.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_p = sub.add_parser("build", help="Join logo.csv, Logos/ and the catalog into resolution_index.bin.")
+    build_p.add_argument("--no-catalog", action="store_true", help="Only use logo.csv and Logos/.")
+    sgo_cache.add_cache_arguments(build_p)
+    lookup_p = sub.add_parser("lookup", help="Resolve 'sport[/league[/team]]', a PREFERRED_FILE_PATH or id:<SGO id>.")
+    lookup_p.add_argument("key")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        sgo_cache.configure_from_args(args)
+        entries = build(use_catalog=not args.no_catalog)
+        counts = [sum(1 for _, level in entries.values() if level == i) for i in range(len(LEVELS))]
+        print(f"{len(entries)} keys -> {INDEX_FILE.name} ({INDEX_FILE.stat().st_size / 1024:.0f} KiB): "
+              + ", ".join(f"{n} {name}" for name, n in zip(LEVELS, counts)))
+    elif args.command == "lookup":
+        result = ResolutionIndex.open().lookup(normalize_key(args.key))
+        if result is None:
+            print("Unknown key.")
+        else:
+            path, level = result
+            print(f"{path or 'no logo'}  ({level})")
+
+if __name__ == "__main__":
+    main()
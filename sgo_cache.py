@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+import requests
+from pathlib import Path
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+SPORTSGAMEODDS_API_KEY = os.environ.get("SPORTSGAMEODDS_API_KEY", "43f558d0dc54d4e2b06a7b3139dea679")
+SGO_BASE_URL = "https://api.sportsgameodds.com/v2"
+
+BASE_DIR = Path(__file__).parent
+CACHE_DIR = BASE_DIR / ".sgo_cache"
+
+# Team catalogs only change a few times a season, so a day is a safe default.
+CACHE_TTL_SECONDS = float(os.environ.get("SGO_CACHE_TTL_HOURS", "24")) * 3600
+FORCE_REFRESH = os.environ.get("SGO_CACHE_REFRESH", "") == "1"
+OFFLINE = os.environ.get("SGO_OFFLINE", "") == "1"
+
+
+def configure(ttl_hours=None, refresh=None, offline=None):
+    """Overrides the cache policy (used by the command line flags of the tools)."""
+    global CACHE_TTL_SECONDS, FORCE_REFRESH, OFFLINE
+    if ttl_hours is not None:
+        CACHE_TTL_SECONDS = float(ttl_hours) * 3600
+    if refresh is not None:
+        FORCE_REFRESH = refresh
+    if offline is not None:
+        OFFLINE = offline
+
+
+def add_cache_arguments(parser):
+    """Adds the shared --refresh / --offline / --cache-ttl-hours flags to a parser."""
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached catalogs and re-fetch from the API.")
+    parser.add_argument("--offline", action="store_true", help="Never hit the API; use cached catalogs of any age.")
+    parser.add_argument("--cache-ttl-hours", type=float, default=None, help="Max age of a cached catalog before it is re-fetched.")
+
+
+def configure_from_args(args):
+    configure(ttl_hours=args.cache_ttl_hours, refresh=args.refresh, offline=args.offline)
+
+# ==================================================================================
+# CACHE STORAGE
+# ==================================================================================
+def cache_path(endpoint, sport_id=None):
+    """One JSON file per (endpoint, sportID) pair."""
+    return CACHE_DIR / f"{endpoint}__{sport_id or 'ALL'}.json"
+
+
+def load_cached(endpoint, sport_id=None):
+    """Returns the cached entry dict ({fetched_at, data}) or None."""
+    path = cache_path(endpoint, sport_id)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if not isinstance(entry, dict) or 'data' not in entry:
+            return None
+        return entry
+    except Exception:
+        return None
+
+
+def save_cached(endpoint, sport_id, data):
+    """Writes the entry to a temp file and renames it into place so readers never see a partial file."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = cache_path(endpoint, sport_id)
+    entry = {
+        "endpoint": endpoint,
+        "sportID": sport_id,
+        "fetched_at": time.time(),
+        "data": data
+    }
+    # Unique per writer: two threads of one process may save the same catalog at once
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=CACHE_DIR, prefix=f".{path.name}.",
+                                     suffix=".tmp", delete=False) as f:
+        json.dump(entry, f)
+    os.replace(f.name, path)
+    return entry
+
+
+def is_fresh(entry):
+    return entry is not None and (time.time() - entry.get('fetched_at', 0)) < CACHE_TTL_SECONDS
+
+# ==================================================================================
+# API ACCESS
+# ==================================================================================
+def fetch_paginated(endpoint, sport_id=None):
+    """Fetches every page of an endpoint, following nextCursor. Raises on HTTP errors."""
+    url = f"{SGO_BASE_URL}/{endpoint}"
+    headers = {"X-Api-Key": SPORTSGAMEODDS_API_KEY}
+    items = []
+    cursor = None
+
+    while True:
+        params = {}
+        if sport_id:
+            params["sportID"] = sport_id
+        if cursor:
+            params["cursor"] = cursor
+
+        resp = requests.get(url, headers=headers, params=params)
+        resp.raise_for_status()
+        data = resp.json()
+
+        batch = data.get('data', []) if isinstance(data, dict) else data
+        items.extend(batch)
+
+        cursor = data.get('nextCursor') if isinstance(data, dict) else None
+        if not cursor:
+            break
+        print(f"    Fetched {len(batch)} {endpoint}. Next cursor: {str(cursor)[:10]}...")
+
+    return items
+
+
+def get_catalog(endpoint, sport_id=None):
+    """
+    Returns the catalog for (endpoint, sportID), going to the API only when needed.
+
+    Fresh cache -> served from disk. Stale/missing -> fetched and stored.
+    --refresh always fetches; --offline never does. If a fetch fails, a stale
+    copy is used rather than returning nothing.
+    """
+    entry = load_cached(endpoint, sport_id)
+
+    if OFFLINE:
+        if entry is None:
+            print(f"  [offline] No cached {endpoint} for {sport_id or 'ALL'}.")
+            return []
+        return entry['data']
+
+    if not FORCE_REFRESH and is_fresh(entry):
+        return entry['data']
+
+    try:
+        data = fetch_paginated(endpoint, sport_id)
+    except Exception as e:
+        print(f"Error fetching {endpoint} for {sport_id or 'ALL'}: {e}")
+        if entry is not None:
+            print(f"  -> Using stale cached {endpoint} ({len(entry['data'])} items).")
+            return entry['data']
+        return []
+
+    save_cached(endpoint, sport_id, data)
+    return data
+
+
+def get_teams(sport_id):
+    return get_catalog("teams", sport_id)
+
+
+def get_leagues(sport_id=None):
+    return get_catalog("leagues", sport_id)
+
+
+def get_sports():
+    return get_catalog("sports")
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def print_info():
+    if not CACHE_DIR.exists():
+        print("Cache is empty.")
+        return
+    now = time.time()
+    for path in sorted(CACHE_DIR.glob("*.json")):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            age_h = (now - entry.get('fetched_at', 0)) / 3600
+            state = "fresh" if is_fresh(entry) else "stale"
+            print(f"  {path.name:<40} {len(entry.get('data', [])):>6} items  {age_h:6.1f}h  {state}")
+        except Exception as e:
+            print(f"  {path.name:<40} unreadable ({e})")
+
+
+def clear_cache():
+    removed = 0
+    if CACHE_DIR.exists():
+        for path in CACHE_DIR.glob("*.json"):
+            path.unlink()
+            removed += 1
+    print(f"Removed {removed} cached catalogs.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SportsGameOdds catalog cache.")
+    parser.add_argument("command", choices=["info", "clear", "warm"])
+    parser.add_argument("sport_ids", nargs="*", help="Sport IDs to warm (default: all sports from /v2/sports).")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    if args.command == "info":
+        print_info()
+    elif args.command == "clear":
+        clear_cache()
+    elif args.command == "warm":
+        sport_ids = args.sport_ids or [s.get('sportID') for s in get_sports() if s.get('sportID')]
+        for sport_id in sport_ids:
+            teams = get_teams(sport_id)
+            leagues = get_leagues(sport_id)
+            print(f"  {sport_id}: {len(teams)} teams, {len(leagues)} leagues")
+
+if __name__ == "__main__":
+    main()
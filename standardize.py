@@ -0,0 +1,173 @@
+import os
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from logo_index import INDEX, iter_files
+
+# ==================================================================================
+# CONFIGURATION
+# ==================================================================================
+BASE_DIR = Path(__file__).parent
+LOGOS_DIR = BASE_DIR / "Logos"
+OUTPUT_DIR = BASE_DIR / "Standardized"
+
+# Square edge lengths produced for every logo; each lands in Standardized/<size>/<same relative path>.png
+SIZES = [int(s) for s in os.environ.get("STANDARDIZE_SIZES", "512,256,128,64").split(",") if s.strip()]
+OUTPUT_FORMAT = "png" # keeps transparency
+WORKERS = int(os.environ.get("STANDARDIZE_WORKERS", "0")) or os.cpu_count() or 1
+
+# Formats Pillow can decode; anything else (e.g. SVG) is reported and left alone.
+# When two sources share a stem in one folder, the earlier suffix here wins.
+SOURCE_PRIORITY = [".png", ".webp", ".gif", ".jpg", ".jpeg", ".bmp"]
+
+# ==================================================================================
+# CONVERSION (runs in worker processes)
+# ==================================================================================
+def to_rgba(img):
+    """First frame, with palette/GIF transparency carried into a real alpha channel."""
+    img.seek(0)
+    return img.convert("RGBA")
+
+
+def fit_box(img, width, height):
+    """Scales to fit a width x height box, keeping the aspect ratio, and centers it on a transparent canvas."""
+    scale = min(width / img.width, height / img.height)
+    new_w, new_h = max(1, round(img.width * scale)), max(1, round(img.height * scale))
+    resized = img.resize((new_w, new_h), Image.LANCZOS)
+    canvas = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    canvas.paste(resized, ((width - new_w) // 2, (height - new_h) // 2))
+    return canvas
+
+
+def fit_square(img, size):
+    return fit_box(img, size, size)
+
+
+def convert_one(job):
+    """
+    Decodes one source once and writes every requested size, each via temp file + rename.
+    `job` is (source path, [(size, output path)]). Returns (source path, error or None).
+    """
+    source, outputs = job
+    try:
+        with Image.open(source) as img:
+            rgba = to_rgba(img)
+        for size, out_path in outputs:
+            out_path = Path(out_path)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+            fit_square(rgba, size).save(tmp_path, format=OUTPUT_FORMAT.upper(), optimize=True)
+            os.replace(tmp_path, out_path)
+        return source, None
+    except Exception as e:
+        return source, str(e)
+
+# ==================================================================================
+# PLANNING
+# ==================================================================================
+def output_path(rel_path, size, output_dir=OUTPUT_DIR):
+    return Path(output_dir) / str(size) / Path(rel_path).with_suffix(f".{OUTPUT_FORMAT}")
+
+
+def existing_outputs(output_dir=OUTPUT_DIR):
+    """Relative output path -> mtime, from one scandir pass over the output tree."""
+    output_dir = Path(output_dir)
+    return {Path(e.path).relative_to(output_dir).as_posix(): e.stat().st_mtime for e in iter_files(output_dir)}
+
+
+def plan(sizes=SIZES, subdir="", force=False, output_dir=OUTPUT_DIR):
+    """
+    Returns (jobs, skipped, unsupported). A source is queued with just the sizes whose
+    output is missing or older than the source; up-to-date outputs are left alone.
+    """
+    output_dir = Path(output_dir)
+    existing = {} if force else existing_outputs(output_dir)
+    prefix = subdir.strip("/") + "/" if subdir else ""
+
+    # One source per output name: a.png beats a.gif beats a.jpg in the same folder
+    chosen = {}
+    unsupported = []
+    for rel_path in INDEX.all_files():
+        if not rel_path.startswith(prefix):
+            continue
+        suffix = Path(rel_path).suffix.lower()
+        if suffix not in SOURCE_PRIORITY:
+            unsupported.append(rel_path)
+            continue
+        key = Path(rel_path).with_suffix("").as_posix().casefold()
+        current = chosen.get(key)
+        if current is None or SOURCE_PRIORITY.index(suffix) < SOURCE_PRIORITY.index(Path(current).suffix.lower()):
+            chosen[key] = rel_path
+
+    jobs = []
+    skipped = 0
+    for rel_path in sorted(chosen.values()):
+        source_mtime = INDEX.get(rel_path)["mtime"]
+        outputs = []
+        for size in sizes:
+            out_path = output_path(rel_path, size, output_dir)
+            out_rel = out_path.relative_to(output_dir).as_posix()
+            if out_rel in existing and existing[out_rel] >= source_mtime:
+                continue
+            outputs.append((size, str(out_path)))
+        if outputs:
+            jobs.append((str(LOGOS_DIR / rel_path), outputs))
+        else:
+            skipped += 1
+    return jobs, skipped, unsupported
+
+
+def prune(sizes=SIZES, output_dir=OUTPUT_DIR):
+    """Deletes outputs whose source is gone (renamed or removed). Returns the count."""
+    wanted = set()
+    for rel_path in INDEX.all_files():
+        for size in sizes:
+            wanted.add(output_path(rel_path, size, output_dir).relative_to(output_dir).as_posix())
+    size_dirs = {str(s) for s in sizes}
+    removed = 0
+    for out_rel in existing_outputs(output_dir):
+        if out_rel.split("/")[0] in size_dirs and out_rel not in wanted:
+            os.remove(Path(output_dir) / out_rel)
+            removed += 1
+    return removed
+
+
+def run(sizes=SIZES, subdir="", force=False, workers=WORKERS, output_dir=OUTPUT_DIR):
+    jobs, skipped, unsupported = plan(sizes, subdir, force, output_dir)
+    print(f"{len(jobs)} logos to convert, {skipped} up to date, {len(unsupported)} in unsupported formats.")
+    failed = []
+    if jobs:
+        # Largest sources first so one big PNG doesn't finish last on a single core
+        jobs.sort(key=lambda job: -(INDEX.get(job[0]) or {}).get("size", 0))
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+            for done, (source, error) in enumerate(executor.map(convert_one, jobs, chunksize=8), 1):
+                if error:
+                    failed.append((source, error))
+                    print(f"  [ERR] {Path(source).name}: {error}")
+                elif done % 100 == 0 or done == len(jobs):
+                    print(f"  {done}/{len(jobs)} converted")
+    print(f"Done: {len(jobs) - len(failed)} converted, {len(failed)} failed, output in {output_dir}.")
+    return jobs, failed
+
+# ==================================================================================
+# CLI
+# ==================================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Convert every logo to square transparent PNGs at standard sizes.")
+    parser.add_argument("subdir", nargs="?", default="", help="Folder under Logos/ (default: everything).")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES), help="Comma-separated edge lengths.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Worker processes (default: all cores).")
+    parser.add_argument("--force", action="store_true", help="Rebuild outputs even if they are newer than the source.")
+    parser.add_argument("--prune", action="store_true", help="Delete outputs whose source no longer exists.")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    run(sizes, args.subdir, args.force, args.workers)
+    if args.prune:
+        print(f"Pruned {prune(sizes)} stale outputs.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+from pathlib import Path
+
+import pytest
+
+import rename_engine
+import rename_history
+from blob_store import BLOBS
+from logo_index import INDEX
+from manifest import MANIFEST
+
+
+@pytest.fixture
+def logos(tmp_path, monkeypatch):
+    """
+    A throwaway Logos/ tree that the index, the history and the blob store all point at.
+    History functions bind HISTORY_FILE as a default argument, so tests also pass history_path.
+    """
+    root = tmp_path / "Logos"
+    (root / "S").mkdir(parents=True)
+    monkeypatch.setattr(rename_history, "LOGOS_DIR", root)
+    monkeypatch.setattr(rename_history, "HISTORY_FILE", tmp_path / "history.jsonl")
+    monkeypatch.setattr(INDEX, "root", root)
+    monkeypatch.setattr(INDEX, "files", None)
+    monkeypatch.setattr(BLOBS, "root", tmp_path / "Blobs")
+    monkeypatch.setattr(BLOBS, "names_path", tmp_path / "Blobs" / "names.json")
+    monkeypatch.setattr(BLOBS, "history_path", tmp_path / "Blobs" / "history.jsonl")
+    monkeypatch.setattr(BLOBS, "names", None)
+    return root
+
+
+def run_and_undo(root, tmp_path, files, requests):
+    for name, content in files.items():
+        (root / "S" / name).write_text(content)
+    INDEX.refresh()
+    history = tmp_path / "history.jsonl"
+
+    moves, steps = rename_engine.plan_renames([(root / "S" / old, new) for old, new in requests])
+    applied = []
+    errors = rename_engine.execute(moves, steps, journal_path=tmp_path / "journal.jsonl", applied=applied)
+    assert not any(errors.values())
+    rename_history.append_run("test", applied, history_path=history)
+
+    records = rename_history.read_history(history)
+    reverted, failed = rename_history.undo(rename_history.pending_entries(records), history_path=history)
+    assert not failed
+    return {p.name: p.read_text() for p in (root / "S").iterdir()}
+
+
+def test_undo_chain(logos, tmp_path):
+    # A->B while B->C runs as B->C first, then A->B
+    after = run_and_undo(logos, tmp_path, {"A.gif": "a", "B.gif": "b"}, [("A.gif", "B"), ("B.gif", "C")])
+    assert after == {"A.gif": "a", "B.gif": "b"}
+
+
+def test_undo_cycle(logos, tmp_path):
+    # A<->B goes through a .rename-*.tmp parking name
+    after = run_and_undo(logos, tmp_path, {"A.gif": "a", "B.gif": "b"}, [("A.gif", "B"), ("B.gif", "A")])
+    assert after == {"A.gif": "a", "B.gif": "b"}
+
+
+def test_resume_never_overwrites(logos, tmp_path):
+    # Both steps of the chain ran but their 'done' records never reached the journal
+    root = logos / "S"
+    for name, content in {"A.gif": "a", "B.gif": "b"}.items():
+        (root / name).write_text(content)
+    INDEX.refresh()
+    moves, steps = rename_engine.plan_renames([(root / "A.gif", "B"), (root / "B.gif", "C")])
+    journal = tmp_path / "journal.jsonl"
+    with open(journal, 'w', encoding='utf-8') as f:
+        rename_engine._append(f, {"type": "begin", "meta": {}, "moves": moves, "steps": steps}, sync=True)
+    for step in steps:
+        Path(step["src"]).rename(step["dst"])
+
+    rename_engine.recover("resume", journal_path=journal, history_path=tmp_path / "history.jsonl")
+    assert {p.name: p.read_text() for p in root.iterdir()} == {"B.gif": "a", "C.gif": "b"}
+    assert journal.exists()  # the conflict is left for a person to look at
+
+
+def test_unchanged_name_keeps_its_file(logos, tmp_path):
+    # Bulls.gif keeps its name, so chicago.gif has to take Bulls_1 rather than land on it
+    root = logos / "S"
+    for name, content in {"chicago.gif": "chicago", "Bulls.gif": "bulls"}.items():
+        (root / name).write_text(content)
+    INDEX.refresh()
+    moves, steps = rename_engine.plan_renames([(root / "chicago.gif", "Bulls"), (root / "Bulls.gif", "Bulls")])
+    errors = rename_engine.execute(moves, steps, journal_path=tmp_path / "journal.jsonl")
+    assert not any(errors.values())
+    assert {p.name: p.read_text() for p in root.iterdir()} == {"Bulls.gif": "bulls", "Bulls_1.gif": "chicago"}
+
+
+def test_execute_never_overwrites(logos, tmp_path):
+    # The target appeared after planning
+    root = logos / "S"
+    (root / "A.gif").write_text("a")
+    INDEX.refresh()
+    moves, steps = rename_engine.plan_renames([(root / "A.gif", "B")])
+    (root / "B.gif").write_text("b")
+    errors = rename_engine.execute(moves, steps, journal_path=tmp_path / "journal.jsonl")
+    assert isinstance(errors[0], FileExistsError)
+    assert {p.name: p.read_text() for p in root.iterdir()} == {"A.gif": "a", "B.gif": "b"}
+
+
+def run_batch(root, tmp_path, files, requests):
+    for name, content in files.items():
+        (root / name).write_text(content)
+    INDEX.refresh()
+    moves, steps = rename_engine.plan_renames([(root / old, new) for old, new in requests])
+    errors = rename_engine.execute(moves, steps, journal_path=tmp_path / "journal.jsonl")
+    assert not any(errors.values())
+    assert not (tmp_path / "journal.jsonl").exists()
+    return {p.name: p.read_text() for p in root.iterdir()}
+
+
+def test_swap(logos, tmp_path):
+    after = run_batch(logos / "S", tmp_path, {"A.gif": "a", "B.gif": "b"}, [("A.gif", "B"), ("B.gif", "A")])
+    assert after == {"A.gif": "b", "B.gif": "a"}
+
+
+def test_three_way_cycle(logos, tmp_path):
+    after = run_batch(logos / "S", tmp_path, {"A.gif": "a", "B.gif": "b", "C.gif": "c"},
+                      [("A.gif", "B"), ("B.gif", "C"), ("C.gif", "A")])
+    assert after == {"A.gif": "c", "B.gif": "a", "C.gif": "b"}
+
+
+def test_same_target_gets_a_suffix(logos, tmp_path):
+    after = run_batch(logos / "S", tmp_path, {"x.gif": "x", "y.gif": "y", "Bulls.gif": "bulls"},
+                      [("x.gif", "Bulls"), ("y.gif", "Bulls")])
+    assert after == {"Bulls.gif": "bulls", "Bulls_1.gif": "x", "Bulls_2.gif": "y"}
+
+
+def test_case_only_rename(logos, tmp_path):
+    after = run_batch(logos / "S", tmp_path, {"bulls.gif": "bulls"}, [("bulls.gif", "Bulls")])
+    assert after == {"Bulls.gif": "bulls"}
+
+
+def test_case_only_rename_keeps_its_name_claimed(logos, tmp_path):
+    # Bulls.gif and bulls.gif are one name on Windows, so chicago.gif can't take it
+    after = run_batch(logos / "S", tmp_path, {"bulls.gif": "new", "chicago.gif": "old"},
+                      [("bulls.gif", "Bulls"), ("chicago.gif", "bulls")])
+    assert after == {"Bulls.gif": "new", "bulls_1.gif": "old"}
+
+
+def test_undo_edits_the_name_layer_as_one_run(logos, tmp_path, monkeypatch):
+    monkeypatch.setattr("blob_store.LOGOS_DIR", logos)
+    monkeypatch.setattr(MANIFEST, "root", logos)
+    monkeypatch.setattr(MANIFEST, "path", tmp_path / "file_manifest.json")
+    monkeypatch.setattr(MANIFEST, "files", None)
+    (logos / "S" / "A.gif").write_text("a")
+    (logos / "S" / "B.gif").write_text("b")
+    INDEX.refresh()
+    BLOBS.import_tree()
+    BLOBS.save()
+    assert run_and_undo(logos, tmp_path, {}, [("A.gif", "B"), ("B.gif", "A")]) == {"A.gif": "a", "B.gif": "b"}
+    assert BLOBS.resolve("S/A.gif").read_text() == "a"
+    assert BLOBS.resolve("S/B.gif").read_text() == "b"
+    runs = rename_history.summarize_runs(rename_history.read_history(BLOBS.history_path))
+    assert [(tool, kind) for _, tool, kind, _, _ in runs] == [("rename_history.py", "undo")]